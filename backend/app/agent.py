@@ -10,8 +10,9 @@ from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode, tools_condition
 from langchain_core.runnables import RunnableConfig
 from langchain_community.tools import DuckDuckGoSearchRun
-from app.memory_store import GraphMemory
+from app.memory_store import get_memory
 from app.llm_config import llm_config
+from app import fast_json
 from langchain_core.tools import tool
 from app.services.twitch_service import twitch_service
 
@@ -34,7 +35,7 @@ def create_note(title: str, content: str, workspace_id: str = "default"):
             
         # Sync Embedding
         try:
-            mem = GraphMemory(workspace_id=workspace_id, base_dir="./memory_data")
+            mem = get_memory(workspace_id)
             mem.index_note(note_id, title, content)
         except Exception as e:
             pass # Fail silently for agent tools to avoid breaking flow? Or return warning?
@@ -76,7 +77,7 @@ def update_note(note_id: str, content: str = None, title: str = None, workspace_
             
         # Sync Embedding
         try:
-            mem = GraphMemory(workspace_id=workspace_id, base_dir="./memory_data")
+            mem = get_memory(workspace_id)
             # We need to make sure we index the FULL content, so use data['title'] and data['content']
             mem.index_note(note_id, data["title"], data["content"])
         except Exception as e:
@@ -116,7 +117,7 @@ def delete_note(note_id: str, workspace_id: str = "default"):
             # We should probably replicate the sync logic or use the API endpoint logic (but we are in backend).
             # Let's instantiate GraphMemory.
             try:
-                mem = GraphMemory(workspace_id=workspace_id, base_dir="./memory_data")
+                mem = get_memory(workspace_id)
                 mem.delete_note_embedding(note_id)
             except:
                 pass
@@ -132,7 +133,7 @@ def search_notes(query: str, workspace_id: str = "default"):
     Returns the most relevant note snippets.
     """
     try:
-        mem = GraphMemory(workspace_id=workspace_id, base_dir="./memory_data")
+        mem = get_memory(workspace_id)
         results = mem.search_notes(query)
         return results
     except Exception as e:
@@ -459,7 +460,7 @@ def add_graph_node(name: str, type: str, description: str, workspace_id: str = "
     To overwrite/correct, use update_graph_node.
     """
     try:
-        mem = GraphMemory(workspace_id=workspace_id)
+        mem = get_memory(workspace_id)
         mem.add_entity(name, type, description)
         return f"Node '{name}' added/updated successfully."
     except Exception as e:
@@ -473,7 +474,7 @@ def update_graph_node(name: str, type: str = None, description: str = None, work
     Pass None for fields you don't want to change.
     """
     try:
-        mem = GraphMemory(workspace_id=workspace_id)
+        mem = get_memory(workspace_id)
         success = mem.update_entity(name, type, description)
         if success:
             return f"Node '{name}' updated successfully."
@@ -489,7 +490,7 @@ def add_graph_edge(source: str, target: str, relation: str, workspace_id: str =
     Both source and target nodes will be created if they don't exist.
     """
     try:
-        mem = GraphMemory(workspace_id=workspace_id)
+        mem = get_memory(workspace_id)
         mem.add_relation(source, target, relation)
         return f"Edge from '{source}' to '{target}' added successfully."
     except Exception as e:
@@ -502,7 +503,7 @@ def delete_graph_node(node_id: str, workspace_id: str = "default"):
     WARNING: This also removes all edges connected to this node.
     """
     try:
-        mem = GraphMemory(workspace_id=workspace_id)
+        mem = get_memory(workspace_id)
         mem.delete_entity(node_id)
         return f"Node '{node_id}' deleted."
     except Exception as e:
@@ -514,7 +515,7 @@ def delete_graph_edge(source: str, target: str, workspace_id: str = "default"):
     Deletes a specific relationship (edge) between two nodes.
     """
     try:
-        mem = GraphMemory(workspace_id=workspace_id)
+        mem = get_memory(workspace_id)
         mem.delete_relation(source, target)
         return f"Edge between '{source}' and '{target}' deleted."
     except Exception as e:
@@ -527,7 +528,7 @@ def update_graph_edge(source: str, target: str, new_relation: str, workspace_id:
     This only works if the edge already exists.
     """
     try:
-        mem = GraphMemory(workspace_id=workspace_id)
+        mem = get_memory(workspace_id)
         success = mem.update_relation(source, target, new_relation)
         if success:
             return f"Edge from '{source}' to '{target}' updated to '{new_relation}'."
@@ -543,7 +544,7 @@ def search_graph_nodes(query: str, workspace_id: str = "default"):
     Returns a list of matching node IDs.
     """
     try:
-        mem = GraphMemory(workspace_id=workspace_id)
+        mem = get_memory(workspace_id)
         nodes = mem.get_related_nodes(query, n=10)
         return f"Found relevant nodes:\n" + "\n".join([f"- {n}" for n in nodes]) if nodes else "No matching nodes found."
     except Exception as e:
@@ -557,7 +558,7 @@ def traverse_graph_node(node_id: str, workspace_id: str = "default"):
     Use this to look up a node's connections before deciding where to go next.
     """
     try:
-        mem = GraphMemory(workspace_id=workspace_id)
+        mem = get_memory(workspace_id)
         data = mem.get_node_neighbors(node_id)
         if not data:
             return f"Node '{node_id}' not found."
@@ -581,7 +582,7 @@ def search_concepts(query: str, workspace_id: str = "default"):
     Returns a list of matching concepts with their summaries.
     """
     try:
-        mem = GraphMemory(workspace_id=workspace_id)
+        mem = get_memory(workspace_id)
         return mem.search_concepts(query)
     except Exception as e:
         return f"Concept search failed: {e}"
@@ -893,7 +894,7 @@ def lookup_skill(query: str, workspace_id: str = "default"):
     The returned instructions tell you HOW to perform the skill - follow them carefully.
     """
     try:
-        mem = GraphMemory(workspace_id=workspace_id)
+        mem = get_memory(workspace_id)
         return mem.search_skills(query)
     except Exception as e:
         return f"Skill lookup failed: {e}"
@@ -938,7 +939,7 @@ def create_skill(title: str, summary: str, explanation: str, workspace_id: str =
             json.dump(skill_data, f, indent=2)
         
         # Index for semantic search
-        mem = GraphMemory(workspace_id=workspace_id)
+        mem = get_memory(workspace_id)
         mem.index_skill(skill_id, skill_data["title"], skill_data["summary"], skill_data["explanation"])
         
         return f"✅ Skill '{title}' created successfully (ID: {skill_id}). You can now use lookup_skill to find and apply this skill."
@@ -1005,7 +1006,7 @@ async def retrieve_node(state: AgentState):
     import asyncio
     workspace_id = state.get("workspace_id", "default")
     # Instantiate memory for this workspace
-    memory_store = GraphMemory(workspace_id=workspace_id)
+    memory_store = get_memory(workspace_id)
     
     # Load Config from Workspace Settings
     k = 3
@@ -1015,8 +1016,8 @@ async def retrieve_node(state: AgentState):
     try:
         config_path = os.path.join("memory_data", workspace_id, "config.json")
         if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                ws_config = json.load(f)
+            with open(config_path, 'rb') as f:
+                ws_config = fast_json.loads(f.read())
                 k = ws_config.get("graph_k", 3)
                 depth = ws_config.get("graph_depth", 1)
                 include_descriptions = ws_config.get("graph_include_descriptions", False)
@@ -1144,8 +1145,8 @@ def generate_node(state: AgentState, config: RunnableConfig):
     
     try:
         config_path = f"./memory_data/{workspace_id}/config.json"
-        with open(config_path, 'r') as f:
-            ws_config = json.load(f)
+        with open(config_path, 'rb') as f:
+            ws_config = fast_json.loads(f.read())
             base_system_prompt = ws_config.get("system_prompt", base_system_prompt)
             allow_search = ws_config.get("allow_search", True)
             enabled_tools = ws_config.get("enabled_tools", DEFAULT_ENABLED_TOOLS)
@@ -1245,28 +1246,31 @@ def generate_node(state: AgentState, config: RunnableConfig):
     NOTE: No tools are currently enabled for this workspace. You can only respond with text.
     """
 
+    # Static instructions first, per-turn context (memory/emotions/notes) last:
+    # provider prompt caches key on a byte-stable prefix, so keeping the parts
+    # that change every turn at the tail lets the static prefix hit the cache.
     system_prompt = f"""{base_system_prompt}
     CURRENT WORKSPACE ID: {workspace_id}
 
-    CONTEXT FROM LONG-TERM MEMORY:
-    {context}
-    
-    {emotion_context}
-    
-    {notes_context}
-
     {tools_section}
-    
+
     If the context is empty, it means you don't recall anything specific about this yet.
     Answer the user's latest message naturally.
-    
+
     IMPORTANT: When using ANY tool, YOU MUST PASS the 'workspace_id' argument as "{workspace_id}" if the tool accepts it. Do not use the default.
-    
+
     GUIDANCE ON CONCEPTS & GRAPH RAG:
     - If the user asks to explore a "Concept" or "Topic", use 'search_concepts' to retrieve the high-level summary and extracted entities.
-    - The Concept summary is just a starting point. Your "Graph RAG" (Graph Retrieval) has already provided detailed relationships in the "CONTEXT FROM LONG-TERM MEMORY" section above.
+    - The Concept summary is just a starting point. Your "Graph RAG" (Graph Retrieval) has already provided detailed relationships in the "CONTEXT FROM LONG-TERM MEMORY" section below.
     - MERGE information from the 'search_concepts' result and the 'CONTEXT' to provide a comprehensive answer.
     - PROACTIVELY PROMOTE your Graph capabilities: Tell the user you can "traverse the graph" or "trace relationships" for specific entities to uncover deeper connections if they wish.
+
+    CONTEXT FROM LONG-TERM MEMORY:
+    {context}
+
+    {emotion_context}
+
+    {notes_context}
     """
     
     
@@ -1275,8 +1279,8 @@ def generate_node(state: AgentState, config: RunnableConfig):
     try:
         config_path = os.path.join("memory_data", workspace_id, "config.json")
         if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                ws_config = json.load(f)
+            with open(config_path, 'rb') as f:
+                ws_config = fast_json.loads(f.read())
                 limit = ws_config.get("chat_message_limit", 20)
     except:
         pass
@@ -1381,10 +1385,11 @@ def generate_node(state: AgentState, config: RunnableConfig):
 
     return {"messages": [response]}
 
-def extract_knowledge_node(state: AgentState):
+async def extract_knowledge_node(state: AgentState):
     """Analyzes the latest interaction to extract new entities and relations."""
+    import asyncio
     workspace_id = state.get("workspace_id", "default")
-    memory_store = GraphMemory(workspace_id=workspace_id)
+    memory_store = get_memory(workspace_id)
 
     # We look at the last Human message and the last AI message
     messages = state["messages"]
@@ -1434,7 +1439,7 @@ def extract_knowledge_node(state: AgentState):
     
     try:
         llm = get_llm()
-        extraction_response = llm.invoke([HumanMessage(content=extraction_prompt)])
+        extraction_response = await llm.ainvoke([HumanMessage(content=extraction_prompt)])
 
         content = extraction_response.content
         print(f"DEBUG: Extraction raw content: {content[:100]}...") # Log start of content
@@ -1443,32 +1448,50 @@ def extract_knowledge_node(state: AgentState):
         match = re.search(r"\{.*\}", content, re.DOTALL)
         if match:
             json_str = match.group(0)
-            data = json.loads(json_str)
-            
+            data = fast_json.loads(json_str)
+
             entities = data.get("entities", [])
             relations = data.get("relations", [])
-            
+
             if not entities and not relations:
                 print("DEBUG: LLM found no entities/relations.")
             
-            # Update Memory
-            for entity in entities:
-                memory_store.add_entity(entity["name"], entity["type"], entity["description"])
-            
-            for rel in relations:
-                memory_store.add_relation(rel["source"], rel["target"], rel["relation"])
-                
+            # Update Memory (blocking embedding work goes to the thread pool)
+            await asyncio.to_thread(memory_store.add_entities_bulk, entities)
+            await asyncio.to_thread(memory_store.add_relations_bulk, relations)
+
             print(f"DEBUG: Extracted {len(entities)} entities and {len(relations)} relations for workspace {workspace_id}.")
         else:
             print("DEBUG: No JSON found in extraction response.")
-            
+
     except Exception as e:
         print(f"DEBUG: Extraction failed: {e}")
         import traceback
         traceback.print_exc()
-        
+
+    # Emotion update is not worth user-visible latency: run it fire-and-forget
+    # off the critical path instead of as a serial graph node. The task set
+    # keeps a strong reference — the loop holds tasks weakly, and an
+    # unreferenced task can be garbage-collected mid-run.
+    task = asyncio.create_task(_run_emotion_update(state))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
     return {}
 
+
+# Strong references for fire-and-forget tasks (see extract_knowledge_node)
+_background_tasks = set()
+
+
+async def _run_emotion_update(state: AgentState):
+    """Background wrapper around update_emotions_node; errors are logged, never raised."""
+    import asyncio
+    try:
+        await asyncio.to_thread(update_emotions_node, state)
+    except Exception as e:
+        print(f"DEBUG: Background emotion update failed: {e}")
+
 def update_emotions_node(state: AgentState):
     """Analyzes the interaction to update the bot's emotional state dynamically."""
     workspace_id = state.get("workspace_id", "default")
@@ -1599,7 +1622,22 @@ JSON:"""
 # --- Graph Definition ---
 workflow = StateGraph(AgentState)
 
-workflow.add_node("retrieve", retrieve_node)
+# Node-level cache: retrieval is deterministic for a given message/workspace
+# snapshot, so identical re-runs within the TTL skip the embedding query.
+# Older langgraph versions lack the API; degrade to uncached.
+try:
+    from langgraph.cache.memory import InMemoryCache
+    from langgraph.types import CachePolicy
+    node_cache = InMemoryCache()
+    retrieve_cache_policy = CachePolicy(ttl=120)
+except ImportError:
+    node_cache = None
+    retrieve_cache_policy = None
+
+if retrieve_cache_policy is not None:
+    workflow.add_node("retrieve", retrieve_node, cache_policy=retrieve_cache_policy)
+else:
+    workflow.add_node("retrieve", retrieve_node)
 workflow.add_node("generate", generate_node)
 async def dynamic_tool_node(state: AgentState, config: RunnableConfig):
     """Executes tool calls with workspace-scoped filtering."""
@@ -1624,8 +1662,8 @@ async def dynamic_tool_node(state: AgentState, config: RunnableConfig):
     try:
         config_path = f"./memory_data/{workspace_id}/config.json"
         if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                ws_config = json.load(f)
+            with open(config_path, 'rb') as f:
+                ws_config = fast_json.loads(f.read())
                 enabled_tools = ws_config.get("enabled_tools", DEFAULT_ENABLED_TOOLS)
     except Exception as e:
         print(f"DEBUG: Error loading tools config: {e}")
@@ -1654,7 +1692,6 @@ async def dynamic_tool_node(state: AgentState, config: RunnableConfig):
 
 workflow.add_node("tools", dynamic_tool_node)
 workflow.add_node("extract", extract_knowledge_node)
-workflow.add_node("update_emotions", update_emotions_node)
 
 workflow.set_entry_point("retrieve")
 workflow.add_edge("retrieve", "generate")
@@ -1675,7 +1712,32 @@ workflow.add_conditional_edges(
 )
 
 workflow.add_edge("tools", "generate")
-workflow.add_edge("extract", "update_emotions")
-workflow.add_edge("update_emotions", END)
-
-app_agent = workflow.compile()
+workflow.add_edge("extract", END)
+
+# Persistent checkpointer: lets thread state (messages + retrieved context)
+# survive across /chat calls keyed by a configurable thread_id, instead of
+# rebuilding everything from scratch each turn.
+try:
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    os.makedirs("./memory_data", exist_ok=True)
+    checkpointer = AsyncSqliteSaver(aiosqlite.connect("./memory_data/checkpoints.db"))
+except ImportError:
+    checkpointer = None
+
+app_agent = workflow.compile(checkpointer=checkpointer, cache=node_cache)
+
+
+async def drop_ephemeral_checkpoint(thread_id: str):
+    """Deletes the checkpoint rows for one thread.
+
+    Endpoints that mint a throwaway uuid per request call this once the run
+    finishes: with the persistent checkpointer compiled in, every ephemeral
+    run would otherwise leave its full message state in checkpoints.db
+    forever — an unbounded leak on the hot path."""
+    if checkpointer is None:
+        return
+    try:
+        await checkpointer.adelete_thread(thread_id)
+    except Exception as e:
+        print(f"DEBUG: checkpoint cleanup failed for {thread_id}: {e}")
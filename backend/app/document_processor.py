@@ -1,9 +1,11 @@
 import os
+import functools
 from langchain_community.document_loaders import TextLoader, PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.messages import HumanMessage
-from app.memory_store import GraphMemory
+from app.memory_store import get_memory
 from app.llm_config import llm_config
+from app import fast_json
 import re
 import json
 
@@ -12,36 +14,57 @@ ingest_status = {}
 # In-memory control flags: { workspace_id: { job_id: "stop" } }
 ingest_control = {}
 
+# Flush accumulated entities/relations to the graph every N chunks
+BULK_FLUSH_EVERY = 5
+
+# Matches the JSON object in an LLM extraction response (compiled once,
+# used once per chunk)
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Returns a cached splitter so separators are compiled once per
+    (chunk_size, chunk_overlap) combination instead of per file."""
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
 import time
 import uuid
 import asyncio
+import heapq
+
+# TTL (seconds) for jobs in a terminal state before they disappear from status
+JOB_TTL = 30
+# Min-heap of (expires_at, workspace_id, job_id) for terminal jobs
+_expiry_heap = []
+
+def _schedule_expiry(workspace_id: str, job_id: str):
+    """Registers a terminal job for TTL cleanup."""
+    updated_at = ingest_status.get(workspace_id, {}).get(job_id, {}).get("updated_at", time.time())
+    heapq.heappush(_expiry_heap, (updated_at + JOB_TTL, workspace_id, job_id))
 
 def get_status(workspace_id: str):
-    """Returns all jobs for a workspace, cleaning up old ones."""
+    """Returns all jobs for a workspace, cleaning up expired terminal ones."""
+    now = time.time()
+
+    # Pop expired terminal jobs from the heap (amortized O(log N) per job;
+    # active jobs are never scanned)
+    while _expiry_heap and _expiry_heap[0][0] < now:
+        _, ws, job_id = heapq.heappop(_expiry_heap)
+        job = ingest_status.get(ws, {}).get(job_id)
+        if job and job["status"] in ["completed", "cancelled", "error"]:
+            ingest_status[ws].pop(job_id, None)
+
     if workspace_id not in ingest_status:
         return {"jobs": []}
-    
-    workspace_jobs = ingest_status[workspace_id]
-    now = time.time()
+
     active_jobs = []
-    keys_to_remove = []
-    
-    for job_id, job in workspace_jobs.items():
-        # Check TTL (30 seconds) for terminal states
-        if job["status"] in ["completed", "cancelled", "error"]:
-            if now - job.get("updated_at", 0) > 30:
-                keys_to_remove.append(job_id)
-                continue
-        
+    for job_id, job in ingest_status[workspace_id].items():
         # Add job_id to the object for frontend convenience
         job_copy = job.copy()
         job_copy["job_id"] = job_id
         active_jobs.append(job_copy)
-        
-    # Cleanup
-    for k in keys_to_remove:
-        del workspace_jobs[k]
-        
+
     return {"jobs": active_jobs}
 
 def stop_ingestion(workspace_id: str, job_id: str):
@@ -79,32 +102,48 @@ async def process_file(file_path: str, workspace_id: str, chunk_size: int = 4800
          del ingest_control[workspace_id][job_id]
 
     try:
-        # 1. Load File (Run in executor to avoid blocking event loop)
-        import asyncio
-        loop = asyncio.get_event_loop()
-        
+        # 1. Load File (in a worker thread to avoid blocking the event loop)
         if file_path.endswith(".pdf"):
             loader = PyPDFLoader(file_path)
         else:
             # Default to text
             loader = TextLoader(file_path)
-        
-        docs = await loop.run_in_executor(None, loader.load)
+
+        docs = await asyncio.to_thread(loader.load)
         
         # 2. Split Text
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        text_splitter = _get_splitter(chunk_size, chunk_overlap)
         chunks = text_splitter.split_documents(docs)
         
         # Update Total
         ingest_status[workspace_id][job_id]["total"] = len(chunks)
         ingest_status[workspace_id][job_id]["updated_at"] = time.time()
         
-        memory = GraphMemory(workspace_id=workspace_id)
-        
+        memory = get_memory(workspace_id)
+
         # 3. Extract Knowledge per Chunk
         count_entities = 0
         count_relations = 0
-    
+
+        # Accumulate extracted items and flush in bulk every few chunks:
+        # one batched embedding call + one Chroma upsert + one graph save per
+        # flush instead of per item.
+        entities_batch = []
+        relations_batch = []
+
+        # The LLM re-emits the same entities/triples across overlapping chunks;
+        # skip duplicates before they cost an embedding + graph write.
+        seen_entities = set()
+        seen_relations = set()
+
+        async def flush_batches():
+            if entities_batch:
+                await asyncio.to_thread(memory.add_entities_bulk, list(entities_batch))
+                entities_batch.clear()
+            if relations_batch:
+                await asyncio.to_thread(memory.add_relations_bulk, list(relations_batch))
+                relations_batch.clear()
+
         for i, chunk in enumerate(chunks):
             # Yield control to event loop - allows pending chat requests to be processed
             await asyncio.sleep(0.1)  # Small delay to let other async tasks run
@@ -117,8 +156,10 @@ async def process_file(file_path: str, workspace_id: str, chunk_size: int = 4800
                 
             if stop_signal:
                 print(f"Ingestion stopped for {workspace_id} job {job_id}")
+                await flush_batches()
                 ingest_status[workspace_id][job_id]["status"] = "cancelled"
                 ingest_status[workspace_id][job_id]["updated_at"] = time.time()
+                _schedule_expiry(workspace_id, job_id)
                 return {"entities_extracted": count_entities, "relations_extracted": count_relations}
 
             # Update Current
@@ -150,8 +191,10 @@ async def process_file(file_path: str, workspace_id: str, chunk_size: int = 4800
                     if workspace_id in ingest_control and ingest_control[workspace_id].get(job_id) == "stop":
                         llm_task.cancel()
                         print(f"Ingestion stopped during LLM call for {workspace_id} job {job_id}")
+                        await flush_batches()
                         ingest_status[workspace_id][job_id]["status"] = "cancelled"
                         ingest_status[workspace_id][job_id]["updated_at"] = time.time()
+                        _schedule_expiry(workspace_id, job_id)
                         return {"entities_extracted": count_entities, "relations_extracted": count_relations}
                     
                     # Wait 1s then check again
@@ -159,37 +202,59 @@ async def process_file(file_path: str, workspace_id: str, chunk_size: int = 4800
                 
                 response = llm_task.result()
                 content = response.content
-                
-                match = re.search(r"\{.*\}", content, re.DOTALL)
+
+                # Cheap shape check before paying parse cost: an obviously
+                # non-JSON reply (prose, markdown) gets one retry with a
+                # stricter reminder instead of silently losing the chunk.
+                if '"entities"' not in content:
+                    try:
+                        retry_response = await llm.ainvoke([HumanMessage(
+                            content=extraction_prompt + "\nRespond with raw JSON only, no prose or markdown."
+                        )])
+                        content = retry_response.content
+                    except Exception as retry_err:
+                        print(f"JSON-only retry failed: {retry_err}")
+
+                match = _JSON_RE.search(content)
                 if match:
                     json_str = match.group(0)
-                    data = json.loads(json_str)
+                    data = fast_json.loads(json_str)
                     
                     entities = data.get("entities", [])
                     relations = data.get("relations", [])
-                    
-                    # Run blocking embedding operations in thread pool to avoid blocking event loop
+
                     for entity in entities:
-                        await asyncio.to_thread(
-                            memory.add_entity, 
-                            entity["name"], 
-                            entity["type"], 
-                            entity["description"]
-                        )
+                        key = (entity.get("name", "").lower(), entity.get("type", "").lower())
+                        if key in seen_entities:
+                            continue
+                        seen_entities.add(key)
+                        entities_batch.append(entity)
                         count_entities += 1
-                    
+
                     for rel in relations:
-                        await asyncio.to_thread(
-                            memory.add_relation,
-                            rel["source"],
-                            rel["target"],
-                            rel["relation"]
+                        key = (
+                            rel.get("source", "").lower(),
+                            rel.get("target", "").lower(),
+                            rel.get("relation", "").lower()
                         )
+                        if key in seen_relations:
+                            continue
+                        seen_relations.add(key)
+                        relations_batch.append(rel)
                         count_relations += 1
-                        
+
+                    # Flush every few chunks so progress persists incrementally
+                    if (i + 1) % BULK_FLUSH_EVERY == 0:
+                        await flush_batches()
+
             except Exception as e:
                 print(f"Error extracting chunk: {e}")
-                
+
+        # Flush whatever is left from the last partial batch, then force the
+        # debounced graph save to hit disk durably
+        await flush_batches()
+        await asyncio.to_thread(memory.flush)
+
         # Final Success Status
         ingest_status[workspace_id][job_id] = {
             "status": "completed",
@@ -198,7 +263,8 @@ async def process_file(file_path: str, workspace_id: str, chunk_size: int = 4800
             "filename": ingest_status[workspace_id][job_id]["filename"],
             "updated_at": time.time()
         }
-                
+        _schedule_expiry(workspace_id, job_id)
+
         return {"entities_extracted": count_entities, "relations_extracted": count_relations}
         
     except Exception as e:
@@ -210,4 +276,5 @@ async def process_file(file_path: str, workspace_id: str, chunk_size: int = 4800
             "total": 0,
             "updated_at": time.time()
         }
+        _schedule_expiry(workspace_id, job_id)
         raise e
@@ -0,0 +1,165 @@
+"""Optional FAISS backend for the entity vector store.
+
+Chroma pays a SQLite transaction plus an HNSW update per upsert; for the
+workspace sizes this app sees (well under 100k vectors) an exact
+``IndexFlatIP`` over normalized vectors is faster on both insert and query.
+Enabled with ``VECTOR_BACKEND=faiss`` (requires ``faiss-cpu``); Chroma stays
+the default.
+
+``FaissCollection`` implements just the slice of the Chroma collection API
+that ``GraphMemory`` uses for entities — ``upsert`` / ``query`` / ``delete`` /
+``get`` with the same argument and result shapes — so the two backends are
+interchangeable at the call sites.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+
+def _normalize(vectors):
+    """L2-normalizes a batch so inner product == cosine similarity."""
+    arr = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+class FaissCollection:
+    def __init__(self, name: str, workspace_dir: str):
+        if faiss is None:
+            raise ImportError(
+                "VECTOR_BACKEND=faiss requires the faiss-cpu package "
+                "(pip install faiss-cpu)"
+            )
+        self.name = name
+        self._lock = threading.Lock()
+        store_dir = os.path.join(workspace_dir, "faiss")
+        os.makedirs(store_dir, exist_ok=True)
+        self.index_path = os.path.join(store_dir, f"{name}.index")
+        self.sidecar_path = os.path.join(store_dir, f"{name}.json")
+
+        # Parallel rows: ids / metadatas / documents share an index with the
+        # vectors in the FAISS index; _row maps id -> position.
+        self.index = None
+        self._ids = []
+        self._metadatas = []
+        self._documents = []
+        self._row = {}
+        self._load()
+
+    def _load(self):
+        if not (os.path.exists(self.index_path) and os.path.exists(self.sidecar_path)):
+            return
+        try:
+            self.index = faiss.read_index(self.index_path)
+            with open(self.sidecar_path, 'r') as f:
+                sidecar = json.load(f)
+            self._ids = sidecar["ids"]
+            self._metadatas = sidecar["metadatas"]
+            self._documents = sidecar["documents"]
+            self._row = {id_: i for i, id_ in enumerate(self._ids)}
+        except Exception as e:
+            print(f"Warning: failed to load FAISS collection {self.name}: {e}")
+            self.index = None
+            self._ids, self._metadatas, self._documents, self._row = [], [], [], {}
+
+    def _save(self):
+        try:
+            faiss.write_index(self.index, self.index_path)
+            with open(self.sidecar_path, 'w') as f:
+                json.dump({
+                    "ids": self._ids,
+                    "metadatas": self._metadatas,
+                    "documents": self._documents,
+                }, f)
+        except Exception as e:
+            print(f"Warning: failed to persist FAISS collection {self.name}: {e}")
+
+    def _rebuild(self, vectors):
+        """Rebuilds the flat index from a full vector matrix (used after
+        deletes; exact copy, no training needed)."""
+        self.index = faiss.IndexFlatIP(vectors.shape[1])
+        if len(vectors):
+            self.index.add(vectors)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        vectors = _normalize(embeddings)
+        with self._lock:
+            if self.index is None:
+                self.index = faiss.IndexFlatIP(vectors.shape[1])
+
+            # Split into updates (rebuild required: flat indexes are
+            # append-only) and plain appends
+            updates = [i for i, id_ in enumerate(ids) if id_ in self._row]
+            if updates:
+                existing = self.index.reconstruct_n(0, self.index.ntotal)
+                for i in updates:
+                    existing[self._row[ids[i]]] = vectors[i]
+                self._rebuild(existing)
+                for i in updates:
+                    row = self._row[ids[i]]
+                    self._metadatas[row] = metadatas[i]
+                    self._documents[row] = documents[i]
+
+            appends = [i for i, id_ in enumerate(ids) if id_ not in self._row]
+            if appends:
+                self.index.add(vectors[appends])
+                for i in appends:
+                    self._row[ids[i]] = len(self._ids)
+                    self._ids.append(ids[i])
+                    self._metadatas.append(metadatas[i])
+                    self._documents.append(documents[i])
+
+            self._save()
+
+    def query(self, query_embeddings, n_results=10, include=None):
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0:
+                empty = [[] for _ in query_embeddings]
+                return {"ids": empty, "metadatas": list(empty), "documents": list(empty),
+                        "distances": list(empty)}
+            vectors = _normalize(query_embeddings)
+            k = min(n_results, self.index.ntotal)
+            scores, rows = self.index.search(vectors, k)
+
+            ids, metadatas, documents, distances = [], [], [], []
+            for q in range(len(query_embeddings)):
+                ids.append([self._ids[r] for r in rows[q]])
+                metadatas.append([self._metadatas[r] for r in rows[q]])
+                documents.append([self._documents[r] for r in rows[q]])
+                # Chroma's cosine space reports distance = 1 - similarity
+                distances.append([1.0 - float(s) for s in scores[q]])
+            return {"ids": ids, "metadatas": metadatas, "documents": documents,
+                    "distances": distances}
+
+    def delete(self, ids):
+        with self._lock:
+            rows = sorted((self._row[id_] for id_ in ids if id_ in self._row), reverse=True)
+            if not rows:
+                return
+            vectors = self.index.reconstruct_n(0, self.index.ntotal)
+            keep = np.ones(len(self._ids), dtype=bool)
+            for row in rows:
+                keep[row] = False
+                del self._ids[row]
+                del self._metadatas[row]
+                del self._documents[row]
+            self._rebuild(vectors[keep])
+            self._row = {id_: i for i, id_ in enumerate(self._ids)}
+            self._save()
+
+    def get(self, include=None):
+        with self._lock:
+            return {"ids": list(self._ids),
+                    "metadatas": list(self._metadatas),
+                    "documents": list(self._documents)}
@@ -0,0 +1,40 @@
+"""Thin JSON helper that prefers orjson with a stdlib fallback.
+
+orjson parses 2-6x faster and dumps ~10x faster than stdlib json, which
+matters on hot paths: the per-turn workspace config read, per-chunk parsing
+of LLM extraction responses, and config save/load.
+"""
+import json as _json
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+
+def loads(data):
+    """Parses JSON from a str, bytes, or memoryview payload."""
+    if _orjson is not None:
+        return _orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    return _json.loads(data)
+
+
+def dumps(obj, indent: bool = False) -> str:
+    """Serializes obj to a JSON string (2-space indented if indent=True)."""
+    if _orjson is not None:
+        option = _orjson.OPT_INDENT_2 if indent else 0
+        return _orjson.dumps(obj, option=option).decode("utf-8")
+    return _json.dumps(obj, indent=2 if indent else None)
+
+
+def dumps_bytes(obj, indent: bool = False) -> bytes:
+    """Serializes obj straight to UTF-8 bytes (skips the decode/encode round
+    trip for streaming responses and binary-mode file writes)."""
+    if _orjson is not None:
+        option = _orjson.OPT_INDENT_2 if indent else 0
+        return _orjson.dumps(obj, option=option)
+    return _json.dumps(obj, indent=2 if indent else None).encode("utf-8")
@@ -1,7 +1,19 @@
 from pydantic import BaseModel
 from typing import Literal, List, Dict, Optional
 import os
-import json
+from app import fast_json
+
+# Hoisted provider imports: the factories below sit on per-chunk/per-turn hot
+# paths, so avoid re-running the import machinery on every call.
+try:
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+except ImportError:
+    ChatOpenAI = OpenAIEmbeddings = None
+
+try:
+    from langchain_ollama import ChatOllama, OllamaEmbeddings
+except ImportError:
+    ChatOllama = OllamaEmbeddings = None
 
 CONFIG_FILE = "llm_config.json"
 
@@ -87,15 +99,15 @@ class LLMConfig:
     def load(self):
         if os.path.exists(CONFIG_FILE):
             try:
-                with open(CONFIG_FILE, 'r') as f:
-                    data = json.load(f)
+                with open(CONFIG_FILE, 'rb') as f:
+                    data = fast_json.loads(f.read())
                     self.config = LLMConfigModel(**data)
             except:
                 pass
 
     def save(self):
         with open(CONFIG_FILE, 'w') as f:
-            json.dump(self.config.model_dump(), f, indent=2)
+            f.write(fast_json.dumps(self.config.model_dump(), indent=True))
 
     def get_config(self) -> LLMConfigModel:
         return self.config
@@ -109,7 +121,8 @@ class LLMConfig:
         cfg = self.config
         
         if cfg.provider == "ollama":
-            from langchain_ollama import ChatOllama
+            if ChatOllama is None:
+                raise RuntimeError("langchain-ollama is not installed")
             return ChatOllama(
                 model=cfg.ollama_chat_model,
                 base_url=cfg.ollama_base_url,
@@ -117,7 +130,8 @@ class LLMConfig:
             )
         else:
             # Works for both "openai" and "lmstudio" (OpenAI-compatible APIs)
-            from langchain_openai import ChatOpenAI
+            if ChatOpenAI is None:
+                raise RuntimeError("langchain-openai is not installed")
             return ChatOpenAI(
                 base_url=cfg.chat_base_url,
                 api_key=cfg.chat_api_key,
@@ -130,14 +144,16 @@ class LLMConfig:
         cfg = self.config
         
         if cfg.embedding_provider == "ollama":
-            from langchain_ollama import OllamaEmbeddings
+            if OllamaEmbeddings is None:
+                raise RuntimeError("langchain-ollama is not installed")
             return OllamaEmbeddings(
                 model=cfg.ollama_embedding_model,
                 base_url=cfg.ollama_base_url
             )
         else:
             # Works for both "openai" and "lmstudio" (OpenAI-compatible APIs)
-            from langchain_openai import OpenAIEmbeddings
+            if OpenAIEmbeddings is None:
+                raise RuntimeError("langchain-openai is not installed")
             return OpenAIEmbeddings(
                 base_url=cfg.embedding_base_url,
                 api_key=cfg.embedding_api_key,
@@ -156,7 +172,8 @@ class LLMConfig:
             return self.get_chat_llm()
         
         if cfg.ingestion_provider == "ollama":
-            from langchain_ollama import ChatOllama
+            if ChatOllama is None:
+                raise RuntimeError("langchain-ollama is not installed")
             return ChatOllama(
                 model=cfg.ingestion_ollama_model,
                 base_url=cfg.ollama_base_url,
@@ -164,7 +181,8 @@ class LLMConfig:
             )
         else:
             # Works for both "openai" and "lmstudio" (OpenAI-compatible APIs)
-            from langchain_openai import ChatOpenAI
+            if ChatOpenAI is None:
+                raise RuntimeError("langchain-openai is not installed")
             return ChatOpenAI(
                 base_url=cfg.ingestion_base_url,
                 api_key=cfg.ingestion_api_key,
@@ -1,70 +1,256 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Path, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from app import fast_json
+from pydantic import BaseModel, ConfigDict
+from typing import List, Dict, Any, Optional
+import asyncio
+import logging
+import logging.handlers
+import os
+import queue
+import uuid
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from app.agent import app_agent
-from app.memory_store import GraphMemory
-from app.routers import workspaces, threads, system, audio, concepts, hot_topics, connectors, graph_chat, skills
+from app.agent import app_agent, drop_ephemeral_checkpoint
+from app.memory_store import get_memory, WORKSPACE_ID_PATTERN
+from app.routers import workspaces, threads, system, concepts, hot_topics, connectors, graph_chat, skills
 import uvicorn
 
-app = FastAPI(title="MyCelium")
+# Lifecycle logging goes through a queue so formatting/IO happens on the
+# listener thread, never on the event loop (stdout writes block under load)
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
 
-# CORS
+logger = logging.getLogger("mycelium")
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+
+from contextlib import asynccontextmanager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Connects MCP servers once at startup and tears them down on shutdown."""
+    # One shared HTTP client for outbound calls (TTS proxy, model listing):
+    # reuses pooled keep-alive connections instead of a TCP+TLS handshake
+    # per request
+    import httpx
+    app.state.http = httpx.AsyncClient(
+        timeout=None,
+        limits=httpx.Limits(max_keepalive_connections=32, keepalive_expiry=30),
+    )
+
+    try:
+        from app.services.mcp_service import mcp_service, refresh_mcp_servers
+        results = await refresh_mcp_servers()
+        for name, result in results.items():
+            if result.get("connected"):
+                logger.info("MCP: Connected to '%s' with %d tools", name, len(result.get('tools', [])))
+            else:
+                logger.warning("MCP: Failed to connect to '%s': %s", name, result.get('error', 'Unknown error'))
+        app.state.mcp = mcp_service
+    except Exception as e:
+        logger.error("MCP: Error during startup: %s", e)
+
+    # Pre-warm so the first real /chat doesn't pay the cold path: load the
+    # default workspace graph/collections, and optionally run a throwaway
+    # agent turn (costs one LLM call, so it is opt-in).
+    try:
+        await asyncio.to_thread(get_memory, "default")
+    except Exception as e:
+        logger.warning("Warmup: default workspace load failed: %s", e)
+    if os.getenv("WARMUP_AGENT", "0") == "1":
+        try:
+            await app_agent.ainvoke(
+                {"messages": [HumanMessage(content="ping")], "context": "", "workspace_id": "__warmup__"},
+                config={"configurable": {"thread_id": "__warmup__"}},
+            )
+            logger.info("Warmup: agent ready")
+        except Exception as e:
+            logger.warning("Warmup: agent ping failed: %s", e)
+
+    batcher_task = asyncio.create_task(_chat_batcher())
+
+    yield
+
+    batcher_task.cancel()
+    await app.state.http.aclose()
+    # Persist any debounced graph writes before the process exits
+    from app.memory_store import flush_all
+    await asyncio.to_thread(flush_all)
+    try:
+        from app.services.mcp_service import mcp_service
+        await mcp_service.disconnect_all()
+        logger.info("MCP: All servers disconnected")
+    except Exception as e:
+        logger.error("MCP: Error during shutdown: %s", e)
+
+
+# orjson serializes the big /graph payloads several times faster than the
+# stdlib encoder behind the default JSONResponse
+app = FastAPI(title="MyCelium", default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# CORS: an explicit origin list lets the middleware emit a static
+# Access-Control-Allow-Origin header instead of reflecting the Origin on
+# every request. ALLOW_ORIGINS is the deployment knob (docker-compose sets
+# ALLOW_ORIGINS=*, which keeps wildcard mode); the default covers the Vite
+# dev server and the compose nginx frontend on :3000.
+origins = os.getenv(
+    "ALLOW_ORIGINS",
+    "http://localhost:5173,http://localhost:3000",
+).split(",")
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
+# Graph JSON is highly repetitive (same keys on every node/edge) and can be
+# multi-MB; gzip cuts it by an order of magnitude. Level 5 balances ratio
+# against CPU; tiny responses are left alone.
+#
+# Streaming routes bypass compression entirely: Starlette gzips streaming
+# responses unconditionally (no minimum_size or content-type check) whenever
+# the client advertises gzip, and zlib's internal buffering then holds small
+# chunks back — re-batching the SSE/NDJSON token streams and the TTS
+# quick-start chunk those endpoints deliberately flush early.
+
+def _is_streaming_path(path: str) -> bool:
+    return (
+        path == "/chat/stream"
+        or path == "/concepts/generate"
+        or path.startswith("/audio/")
+        or (path.endswith("/chat") and path.startswith(("/threads/", "/graph/")))
+    )
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and _is_streaming_path(scope.get("path", "")):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 app.include_router(workspaces.router)
 app.include_router(threads.router)
 app.include_router(system.router)
-app.include_router(audio.router)
 app.include_router(concepts.router)
 app.include_router(hot_topics.router)
 app.include_router(connectors.router)
 app.include_router(graph_chat.router)
 app.include_router(skills.router)
 
+# The audio router drags in the TTS/STT stack; import it only when enabled
+# so headless deployments skip that startup and memory cost
+if os.getenv("ENABLE_AUDIO", "1") == "1":
+    from app.routers import audio
+    app.include_router(audio.router)
 
-# --- MCP Server Lifecycle ---
-@app.on_event("startup")
-async def startup_event():
-    """Connect to configured MCP servers on application startup."""
-    try:
-        from app.services.mcp_service import refresh_mcp_servers
-        results = await refresh_mcp_servers()
-        for name, result in results.items():
-            if result.get("connected"):
-                print(f"MCP: Connected to '{name}' with {len(result.get('tools', []))} tools")
-            else:
-                print(f"MCP: Failed to connect to '{name}': {result.get('error', 'Unknown error')}")
-    except Exception as e:
-        print(f"MCP: Error during startup: {e}")
+# --- /chat micro-batching ---
+# Concurrent chat requests landing within a few ms are coalesced into one
+# app_agent.abatch call, amortizing per-call overhead across callers.
+# A lone request still goes through ainvoke with no added latency beyond
+# the batching window.
+CHAT_BATCH_MAX = int(os.getenv("CHAT_BATCH_MAX", "8"))
+CHAT_BATCH_WINDOW_MS = int(os.getenv("CHAT_BATCH_WINDOW_MS", "10"))
+_chat_queue: asyncio.Queue = asyncio.Queue()
+
+# Strong references to in-flight batch tasks: the loop only holds tasks
+# weakly, and an unreferenced task can be garbage-collected mid-run
+_batch_tasks = set()
 
+async def _run_batch(batch):
+    if len(batch) == 1:
+        state, config, future = batch[0]
+        try:
+            result = await app_agent.ainvoke(state, config=config)
+            if not future.done():
+                future.set_result(result)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        return
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Disconnect all MCP servers on application shutdown."""
     try:
-        from app.services.mcp_service import mcp_service
-        await mcp_service.disconnect_all()
-        print("MCP: All servers disconnected")
+        results = await app_agent.abatch(
+            [b[0] for b in batch],
+            config=[b[1] for b in batch]
+        )
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
     except Exception as e:
-        print(f"MCP: Error during shutdown: {e}")
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+
+async def _chat_batcher():
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _chat_queue.get()]
+        deadline = loop.time() + CHAT_BATCH_WINDOW_MS / 1000
+        while len(batch) < CHAT_BATCH_MAX:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_chat_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # Dispatch without awaiting: the batcher goes straight back to
+        # collecting, so a request arriving mid-run doesn't queue behind a
+        # multi-second agent invocation
+        task = asyncio.create_task(_run_batch(batch))
+        _batch_tasks.add(task)
+        task.add_done_callback(_batch_tasks.discard)
+
+async def _run_agent(state: dict, config: dict):
+    """Enqueues one agent run for the micro-batcher and awaits its result."""
+    future = asyncio.get_running_loop().create_future()
+    await _chat_queue.put((state, config, future))
+    return await future
 
 class ChatRequest(BaseModel):
+    # Rejecting unknown fields keeps the v2 Rust validator on its fast path
+    # (and catches typo'd client payloads early)
+    model_config = ConfigDict(extra="forbid")
+
     message: str
     workspace_id: str = "default"
-    # Thread support could be added here, currently single thread per workspace logical session
+    # Optional checkpoint key: reuse the same thread_id across calls to keep
+    # conversation state server-side (None = fresh ephemeral thread per call)
+    thread_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
     response: str
 
+# Constant body, serialized once at import; frequent liveness polls reuse
+# the same Response object with zero per-request allocation
+_HEALTH_RESPONSE = Response(
+    content=fast_json.dumps({"status": "ok", "service": "mycelium-backend"}),
+    media_type="application/json",
+)
+
+
+@app.get("/health")
+async def health_check():
+    return _HEALTH_RESPONSE
+
+
 @app.post("/chat", response_model=ChatResponse)
+@app.post("/chat/sync", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     try:
         # Prepare state
@@ -82,9 +268,17 @@ async def chat_endpoint(request: ChatRequest):
             "workspace_id": request.workspace_id
         }
         
-        # Run agent
-        final_state = app_agent.invoke(initial_state)
-        
+        # Run agent (async so concurrent chats don't serialize on the event loop;
+        # sync nodes are dispatched to the default executor by LangGraph)
+        config = {"configurable": {"thread_id": request.thread_id or str(uuid.uuid4())}}
+        try:
+            final_state = await _run_agent(initial_state, config)
+        finally:
+            # Throwaway thread: drop its checkpoint rows so checkpoints.db
+            # doesn't grow by one full message state per request
+            if request.thread_id is None:
+                await drop_ephemeral_checkpoint(config["configurable"]["thread_id"])
+
         # Get last AI message
         ai_message = final_state["messages"][-1]
         
@@ -92,20 +286,93 @@ async def chat_endpoint(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming variant of /chat using Server-Sent Events.
+    Emits 'data: {"delta": ...}' frames as soon as the LLM produces tokens,
+    instead of buffering the whole agent run. /chat remains for legacy clients.
+    """
+    initial_state = {
+        "messages": [HumanMessage(content=request.message)],
+        "context": "",
+        "workspace_id": request.workspace_id
+    }
+
+    config = {"configurable": {"thread_id": request.thread_id or str(uuid.uuid4())}}
+
+    async def event_generator():
+        try:
+            async for event in app_agent.astream_events(initial_state, version="v2", config=config):
+                if event["event"] == "on_chat_model_stream":
+                    # Only tokens from the final generation node (skip internal
+                    # LLM calls like extraction/emotions)
+                    if event.get("metadata", {}).get("langgraph_node") == "generate":
+                        content = event["data"]["chunk"].content
+                        if content:
+                            yield f"data: {fast_json.dumps({'delta': content})}\n\n"
+            yield "data: [DONE]\n\n"
+        except Exception as e:
+            print(f"Streaming Error: {e}")
+            yield f"data: {fast_json.dumps({'error': str(e)})}\n\n"
+        finally:
+            if request.thread_id is None:
+                await drop_ephemeral_checkpoint(config["configurable"]["thread_id"])
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+# Same charset get_memory enforces; FastAPI rejects junk ids before any
+# handler (or disk) work happens
+WS_ID_PATTERN = WORKSPACE_ID_PATTERN
+
 @app.get("/graph/{workspace_id}")
-async def get_graph(workspace_id: str):
-    memory = GraphMemory(workspace_id=workspace_id)
-    return memory.get_graph_data()
+async def get_graph(request: Request, response: Response,
+                    workspace_id: str = Path(pattern=WS_ID_PATTERN)):
+    memory = get_memory(workspace_id)
+
+    # Weak ETag from the in-memory mutation version + graph size: the UI
+    # polls this endpoint far more often than the graph changes, so unchanged
+    # graphs short-circuit to a 304 without re-serializing the payload.
+    # (File mtime is no good here — debounced saves mean a mutation can sit
+    # in memory without touching the snapshot, serving 304s for stale data.)
+    etag = f'W/"{workspace_id}-{memory.version}-{memory.graph.number_of_nodes()}-{memory.graph.number_of_edges()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304)
+
+    # Walks the whole NetworkX graph synchronously; keep it off the event loop
+    data = await asyncio.to_thread(memory.get_graph_data)
+    response.headers["ETag"] = etag
+    return data
+
+@app.get("/graph/{workspace_id}/since")
+async def get_graph_since(workspace_id: str = Path(pattern=WS_ID_PATTERN),
+                          version: int = 0, epoch: str = ""):
+    """
+    Delta variant of /graph: returns only nodes/edges changed after 'version'.
+    Bytes per poll scale with change volume instead of graph size. Clients
+    must echo back the 'epoch' from the previous response alongside their
+    version — versions restart with the process, so a delta is only valid
+    within the epoch that issued it. On an unknown epoch, an out-of-range
+    version, or a changelog that no longer reaches back, the full graph is
+    returned with "full": true and the client should resync from it.
+    """
+    memory = get_memory(workspace_id)
+    delta = memory.get_graph_delta(version, epoch=epoch)
+    if delta is None:
+        data = await asyncio.to_thread(memory.get_graph_data)
+        return {"version": memory.version, "epoch": memory.epoch, "full": True, "graph": data}
+    return delta
 
 @app.get("/debug/graph_check/{workspace_id}")
-async def debug_graph_check(workspace_id: str, node_id: str = None):
+async def debug_graph_check(workspace_id: str = Path(pattern=WS_ID_PATTERN), node_id: str = None):
     """Debug endpoint to check if a node exists in the graph."""
-    memory = GraphMemory(workspace_id=workspace_id)
-    graph_data = memory.get_graph_data()
-    node_ids_in_graph = [n['id'] for n in graph_data.get('nodes', [])]
+    memory = get_memory(workspace_id)
+    graph_data = await asyncio.to_thread(memory.get_graph_data)
+    # Set, not list: the mismatch scan below does M membership tests
+    node_ids_in_graph = {n['id'] for n in graph_data.get('nodes', [])}
     
     # Get connectors
-    connectors = memory.get_connectors(limit=20, normalize=False)
+    connectors = await asyncio.to_thread(memory.get_connectors, limit=20, normalize=False)
     connector_ids = [c['id'] for c in connectors]
     
     # Find mismatches
@@ -124,10 +391,37 @@ async def debug_graph_check(workspace_id: str, node_id: str = None):
         result["exists_in_graph_api"] = node_id in node_ids_in_graph
         result["exists_in_networkx"] = memory.graph.has_node(node_id)
         # Check for similar names (case insensitive)
-        similar = [n for n in node_ids_in_graph if node_id.lower() in n.lower()]
+        nid_lower = node_id.lower()
+        similar = [n for n in node_ids_in_graph if nid_lower in n.lower()]
         result["similar_nodes"] = similar[:10]
     
     return result
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    # Default is dev mode: auto-reload, single worker. WEB_CONCURRENCY=1
+    # switches to a plain single worker without reload.
+    #
+    # More than one worker is refused: the shared GraphMemory instances,
+    # debounced graph snapshots and the thread index/parse caches are all
+    # per-process, so parallel workers hold divergent in-memory graphs and
+    # last-writer-wins on graph.json/index.json, silently losing mutations.
+    workers = int(os.getenv("WEB_CONCURRENCY", "0"))
+    if workers > 1:
+        logger.warning(
+            "WEB_CONCURRENCY=%d ignored: the in-process graph and thread "
+            "stores are single-worker only; starting 1 worker", workers)
+        workers = 1
+    # uvloop (libuv event loop) and httptools (C HTTP parser) cut per-request
+    # overhead versus the default asyncio loop + h11 combo
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=not workers,
+        workers=workers or None,
+        loop="uvloop",
+        http="httptools",
+        timeout_keep_alive=30,
+        limit_concurrency=1000,
+        access_log=False,
+    )
@@ -1,14 +1,57 @@
 import networkx as nx
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from langchain_core.documents import Document
+import hashlib
+import heapq
 import json
+import math
 import os
+import re
+import time
 import uuid
+from collections import deque
 from app.llm_config import llm_config
+from app import fast_json
 
 MEMORY_BASE_DIR = "./memory_data"
 
+# Entity vector store backend: "chroma" (default) or "faiss" (exact flat
+# index, much cheaper inserts; requires faiss-cpu — see app.faiss_store)
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "chroma").lower()
+
+# Shared per-workspace instances (see get_memory below)
+import threading
+_memory_cache = {}
+_memory_cache_lock = threading.Lock()
+
+# Workspace ids become directory names; same charset the rename endpoint
+# enforces. Rejecting junk here stops arbitrary ids from creating dirs,
+# Chroma collections and cache entries on disk. The raw pattern is exported
+# so routers can put the same check on their path/body params (FastAPI's
+# Path(pattern=...)) and reject bad ids as 4xx before get_memory raises.
+WORKSPACE_ID_PATTERN = r"^[A-Za-z0-9_\-\s]{1,64}$"
+WORKSPACE_ID_RE = re.compile(WORKSPACE_ID_PATTERN)
+
+
+def quantize_fp16(embedding):
+    """Rounds an embedding to fp16 precision (returned as plain floats for
+    Chroma). Cosine recall is essentially unchanged while the vectors
+    compress/dedupe far better on disk."""
+    return np.asarray(embedding, dtype=np.float16).astype(np.float32).tolist()
+
+
+def quantize_fp16_batch(embeddings):
+    """quantize_fp16 over a list of vectors in one numpy pass."""
+    return np.asarray(embeddings, dtype=np.float16).astype(np.float32).tolist()
+
+
+def content_hash(type_: str, description: str) -> str:
+    """Fingerprint of an entity's embedded content, stored in Chroma metadata
+    so reindexing can skip unchanged nodes."""
+    return hashlib.md5(f"{type_}:{description}".encode()).hexdigest()
+
 class GraphMemory:
     def __init__(self, workspace_id: str = "default", base_dir: str = "./memory_data"):
         self.workspace_id = workspace_id
@@ -20,6 +63,47 @@ class GraphMemory:
         self.graph_path = os.path.join(self.workspace_dir, "graph.json")
         self.graph = nx.Graph()
         self.load_graph()
+
+        # Debounced persistence (see save_graph/flush). Initialized before
+        # journal replay, which marks the graph dirty when it recovers
+        # mutations — assigning these afterwards would clobber that and the
+        # recovered graph would never get snapshotted.
+        self._dirty = False
+        self._mutations_since_save = 0
+        self._last_save = 0.0
+
+        # Append-only mutation journal: covers the window between debounced
+        # snapshots (see _journal_append / _replay_journal)
+        self.journal_path = os.path.join(self.workspace_dir, "graph.jsonl")
+        self._journal = None
+        self._replay_journal()
+
+        # Delta sync: monotonic version bumped per mutation, plus a
+        # ring-buffered changelog so /graph/{ws}/since can ship only what
+        # changed (clients whose version predates the buffer re-fetch fully).
+        # version restarts at 0 with the process, so deltas are only valid
+        # within one instance lifetime — the epoch tags that lifetime, and a
+        # client presenting a different epoch is resynced in full.
+        self.version = 0
+        self.epoch = uuid.uuid4().hex
+        self.changelog = deque(maxlen=1000)
+
+        # Bounded embedding cache (see _embed)
+        self._embed_cache = {}
+
+        # Compact adjacency for BFS (see _get_adj); None = needs rebuild
+        self._adj = None
+
+        # Betweenness cache for get_connectors, keyed by (version, k)
+        self._centrality_cache = {}
+
+        # Sorted analytics results, invalidated by version bump: hot topics
+        # as (version, results); connectors as {(version, k, normalize): sorted}
+        self._hot_topics_cache = None
+        self._connectors_cache = {}
+
+        # Memoized node-link dict for get_graph_data: (version, data)
+        self._node_link_cache = None
         
         # 2. Initialize Vector Store (ChromaDB)
         # ChromaDB requires a specific path. We will use a subfolder per workspace.
@@ -27,10 +111,14 @@ class GraphMemory:
         
         # Use embedding model based on configured provider (OpenAI, Ollama, or LM Studio)
         self.embedding_fn = llm_config.get_embeddings()
-        self.collection = self.chroma_client.get_or_create_collection(
-            name="entity_embeddings",
-            metadata={"hnsw:space": "cosine"}
-        )
+        if VECTOR_BACKEND == "faiss":
+            from app.faiss_store import FaissCollection
+            self.collection = FaissCollection("entity_embeddings", self.workspace_dir)
+        else:
+            self.collection = self.chroma_client.get_or_create_collection(
+                name="entity_embeddings",
+                metadata={"hnsw:space": "cosine"}
+            )
         self.note_collection = self.chroma_client.get_or_create_collection(
             name="note_embeddings",
             metadata={"hnsw:space": "cosine"}
@@ -47,21 +135,25 @@ class GraphMemory:
     def load_graph(self):
         if os.path.exists(self.graph_path):
             try:
-                with open(self.graph_path, 'r') as f:
-                    data = json.load(f)
-                    # Normalize 'edges' vs 'links' for NetworkX compatibility
-                    if 'links' not in data:
-                        if 'edges' in data:
-                            data['links'] = data['edges']
-                        else:
-                            data['links'] = []
-                            
-                    # Ensure 'nodes' exists
-                    if 'nodes' not in data:
-                        data['nodes'] = []
-                        
+                with open(self.graph_path, 'rb') as f:
+                    data = fast_json.loads(f.read())
+                    # Files we wrote ourselves carry a version marker and are
+                    # guaranteed to use the 'links' key; only normalize
+                    # foreign files (imports, hand edits)
+                    if data.pop('_v', None) is None:
+                        # Normalize 'edges' vs 'links' for NetworkX compatibility
+                        if 'links' not in data:
+                            if 'edges' in data:
+                                data['links'] = data['edges']
+                            else:
+                                data['links'] = []
+
+                        # Ensure 'nodes' exists
+                        if 'nodes' not in data:
+                            data['nodes'] = []
+
                     self.graph = nx.node_link_graph(data)
-            except json.JSONDecodeError as e:
+            except ValueError as e:  # covers orjson and stdlib decode errors
                 print(f"ERROR: Graph file {self.graph_path} is corrupted: {e}")
                 print("Backing up corrupted file and starting fresh.")
                 try:
@@ -77,25 +169,133 @@ class GraphMemory:
     
     # ... rest of methods assume self.graph is correct ...
 
-    def save_graph(self):
+    # Debounce knobs: at most one disk write per interval OR per N mutations,
+    # whichever comes first
+    SAVE_INTERVAL_S = 2.0
+    SAVE_EVERY_N = 25
+
+    def _write_graph(self, durable: bool = False):
         data = nx.node_link_data(self.graph)
+        data['_v'] = 2  # schema marker: load_graph skips key normalization
         tmp_path = self.graph_path + ".tmp"
         try:
             with open(tmp_path, 'w') as f:
-                json.dump(data, f)
-                f.flush()
-                os.fsync(f.fileno())
+                f.write(fast_json.dumps(data))
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
             os.replace(tmp_path, self.graph_path)
+            self._dirty = False
+            self._mutations_since_save = 0
+            self._last_save = time.time()
+            self._truncate_journal()
         except Exception as e:
             print(f"Error saving graph: {e}")
             if os.path.exists(tmp_path):
                 os.remove(tmp_path)
+
+    def _journal_append(self, op: str, payload: dict):
+        """Appends one JSON line per mutation to graph.jsonl (no fsync).
+
+        Debounced snapshots (save_graph) leave a window where mutations exist
+        only in memory; the journal makes each mutation O(1)-durable against
+        process crashes instead of rewriting the whole graph. _write_graph
+        truncates it once the snapshot has caught up."""
+        try:
+            if self._journal is None:
+                self._journal = open(self.journal_path, 'a')
+            self._journal.write(fast_json.dumps({"op": op, **payload}) + "\n")
+            self._journal.flush()
+        except Exception as e:
+            print(f"Warning: journal write failed: {e}")
+
+    def _truncate_journal(self):
+        """Drops journal entries already folded into the snapshot."""
+        try:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+        except OSError as e:
+            print(f"Warning: could not truncate journal: {e}")
+
+    def _replay_journal(self):
+        """Re-applies mutations journaled after the last snapshot (i.e. the
+        process died before the debounced save ran). Torn trailing lines from
+        a crash are skipped."""
+        if not os.path.exists(self.journal_path):
+            return
+        replayed = 0
+        try:
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = fast_json.loads(line)
+                    except ValueError:
+                        continue
+                    op = entry.get("op")
+                    if op == "add_node":
+                        self.graph.add_node(entry["id"], type=entry.get("type", "Unknown"),
+                                            description=entry.get("description", ""))
+                    elif op == "add_edge":
+                        self.graph.add_edge(entry["source"], entry["target"],
+                                            relation=entry.get("relation"))
+                    elif op == "remove_node":
+                        if self.graph.has_node(entry["id"]):
+                            self.graph.remove_node(entry["id"])
+                    elif op == "remove_edge":
+                        if self.graph.has_edge(entry["source"], entry["target"]):
+                            self.graph.remove_edge(entry["source"], entry["target"])
+                    replayed += 1
+        except Exception as e:
+            print(f"Warning: journal replay failed: {e}")
+        if replayed:
+            print(f"Replayed {replayed} journaled mutations for workspace {self.workspace_id}")
+            self._dirty = True
+
+    def save_graph(self):
+        """Marks the graph dirty and writes it out at most once per
+        SAVE_INTERVAL_S / SAVE_EVERY_N mutations. Per-mutation fsync dominated
+        wall time on bulk ingest; the debounced path skips fsync too since the
+        graph is rebuildable (use flush() for a durable write)."""
+        self._dirty = True
+        self._mutations_since_save += 1
+        if (time.time() - self._last_save >= self.SAVE_INTERVAL_S
+                or self._mutations_since_save >= self.SAVE_EVERY_N):
+            self._write_graph()
+
+    def flush(self):
+        """Durably persists any pending changes (fsync'd atomic replace).
+        Called at shutdown and after ingest batches."""
+        if self._dirty:
+            self._write_graph(durable=True)
             
+    # Embedding cache bound; each entry is one vector (~6KB at 1536-D fp32)
+    EMBED_CACHE_SIZE = 4096
+
+    def _embed(self, text: str):
+        """embed_query with a bounded cache: repeated identical inputs (the
+        same search text, an unchanged description) skip the round-trip to
+        the embedding provider entirely."""
+        cached = self._embed_cache.get(text)
+        if cached is not None:
+            return cached
+        embedding = quantize_fp16(self.embedding_fn.embed_query(text))
+        if len(self._embed_cache) >= self.EMBED_CACHE_SIZE:
+            # Evict oldest insertion (dicts preserve insertion order)
+            self._embed_cache.pop(next(iter(self._embed_cache)))
+        self._embed_cache[text] = embedding
+        return embedding
+
     # --- Note Embedding Methods ---
     def index_note(self, note_id: str, title: str, content: str):
         """Upserts a note's embedding."""
         text = f"Title: {title}\n\nContent:\n{content}"
-        embedding = self.embedding_fn.embed_query(text)
+        embedding = self._embed(text)
         
         self.note_collection.upsert(
             ids=[note_id],
@@ -113,44 +313,43 @@ class GraphMemory:
             
     def search_notes(self, query: str, k: int = 5):
         """Searches notes by semantic similarity."""
-        query_embedding = self.embedding_fn.embed_query(query)
+        query_embedding = self._embed(query)
         results = self.note_collection.query(
             query_embeddings=[query_embedding],
-            n_results=k
+            n_results=k,
+            include=["metadatas", "documents"]  # skip shipping embeddings back
         )
         
-        hits = []
-        if results['ids'] and results['ids'][0]:
-            for i, note_id in enumerate(results['ids'][0]):
-                meta = results['metadatas'][0][i]
-                doc = results['documents'][0][i]
-                hits.append(f"Note ID: {note_id} (Title: {meta.get('title')})\n---\n{doc}\n---")
-        
-        return "\n\n".join(hits) if hits else "No relevant notes found."
+        ids = results['ids'][0] if results['ids'] else []
+        if not ids:
+            return "No relevant notes found."
+
+        metas = results['metadatas'][0]
+        docs = results['documents'][0]
+        return "\n\n".join(
+            f"Note ID: {note_id} (Title: {metas[i].get('title')})\n---\n{docs[i]}\n---"
+            for i, note_id in enumerate(ids)
+        )
 
     def upsert_concepts(self, concepts: list):
         """Indexes concepts in the vector store."""
         if not concepts:
             return
             
-        ids = []
-        embeddings = []
-        documents = []
-        metadatas = []
-        
-        for c in concepts:
-            # Create a rich text representation for embedding
-            text = f"Concept: {c['title']}\nSummary: {c['summary']}\nEntities: {', '.join(c['nodes'][:10])}..."
-            embedding = self.embedding_fn.embed_query(text)
-            
-            ids.append(c['id'])
-            embeddings.append(embedding)
-            documents.append(text)
-            metadatas.append({
-                "title": c['title'],
-                "node_count": len(c['nodes'])
-            })
-            
+        # Create a rich text representation per concept, then embed the whole
+        # batch in ONE call (as reindex_graph does) instead of one round-trip
+        # per concept
+        ids = [c['id'] for c in concepts]
+        documents = [
+            f"Concept: {c['title']}\nSummary: {c['summary']}\nEntities: {', '.join(c['nodes'][:10])}..."
+            for c in concepts
+        ]
+        metadatas = [
+            {"title": c['title'], "node_count": len(c['nodes'])}
+            for c in concepts
+        ]
+        embeddings = quantize_fp16_batch(self.embedding_fn.embed_documents(documents))
+
         self.concept_collection.upsert(
             ids=ids,
             embeddings=embeddings,
@@ -166,7 +365,7 @@ class GraphMemory:
         # 1. Direct text matching on concept titles (catches exact/partial matches)
         query_lower = query.lower()
         try:
-            all_concepts = self.concept_collection.get()
+            all_concepts = self.concept_collection.get(include=["metadatas", "documents"])
             if all_concepts['ids']:
                 for i, concept_id in enumerate(all_concepts['ids']):
                     meta = all_concepts['metadatas'][i] if all_concepts['metadatas'] else {}
@@ -183,10 +382,11 @@ class GraphMemory:
         remaining_k = k - len(hits)
         if remaining_k > 0:
             try:
-                query_embedding = self.embedding_fn.embed_query(query)
+                query_embedding = self._embed(query)
                 results = self.concept_collection.query(
                     query_embeddings=[query_embedding],
-                    n_results=k  # Request k, filter dupes below
+                    n_results=k,  # Request k, filter dupes below
+                    include=["metadatas", "documents"]
                 )
                 
                 if results['ids'] and results['ids'][0]:
@@ -209,7 +409,7 @@ class GraphMemory:
         """Upserts a skill's embedding based on title and summary for search."""
         # Embed title + summary for semantic search
         text = f"Skill: {title}\nSummary: {summary}"
-        embedding = self.embedding_fn.embed_query(text)
+        embedding = self._embed(text)
         
         self.skill_collection.upsert(
             ids=[skill_id],
@@ -234,27 +434,29 @@ class GraphMemory:
         Searches skills by semantic similarity and returns the full explanation.
         Used by the LLM tool to find and apply learned skills.
         """
-        query_embedding = self.embedding_fn.embed_query(query)
+        query_embedding = self._embed(query)
         results = self.skill_collection.query(
             query_embeddings=[query_embedding],
-            n_results=k
+            n_results=k,
+            include=["metadatas"]
         )
         
-        hits = []
-        if results['ids'] and results['ids'][0]:
-            for i, skill_id in enumerate(results['ids'][0]):
-                meta = results['metadatas'][0][i]
-                title = meta.get('title', 'Unknown')
-                summary = meta.get('summary', '')
-                explanation = meta.get('explanation', '')
-                hits.append(f"### Skill: {title}\n**Summary**: {summary}\n\n**Instructions**:\n{explanation}")
-        
-        return "\n\n---\n\n".join(hits) if hits else "No matching skills found."
+        ids = results['ids'][0] if results['ids'] else []
+        if not ids:
+            return "No matching skills found."
+
+        metas = results['metadatas'][0]
+        return "\n\n---\n\n".join(
+            f"### Skill: {meta.get('title', 'Unknown')}\n"
+            f"**Summary**: {meta.get('summary', '')}\n\n"
+            f"**Instructions**:\n{meta.get('explanation', '')}"
+            for meta in metas
+        )
     
     def get_skill_by_id(self, skill_id: str) -> dict:
         """Gets a specific skill by ID from the vector store."""
         try:
-            results = self.skill_collection.get(ids=[skill_id])
+            results = self.skill_collection.get(ids=[skill_id], include=["metadatas"])
             if results['ids'] and results['ids'][0]:
                 meta = results['metadatas'][0]
                 return {
@@ -267,68 +469,142 @@ class GraphMemory:
             pass
         return None
 
+    def search_all(self, query: str, k_notes: int = 5, k_concepts: int = 3,
+                   k_skills: int = 3, k_entities: int = 3, depth: int = 1) -> dict:
+        """Runs the entity, note, concept and skill searches for one query.
+
+        The query string is embedded once: every lookup goes through the
+        bounded _embed cache, so the three follow-up searches reuse the first
+        call's vector instead of paying three more embedding round-trips."""
+        return {
+            "entities": self.retrieve_context(query, k=k_entities, depth=depth),
+            "notes": self.search_notes(query, k=k_notes),
+            "concepts": self.search_concepts(query, k=k_concepts),
+            "skills": self.search_skills(query, k=k_skills),
+        }
+
     def add_entity(self, name: str, type: str, description: str):
+        """Adds or updates an entity in the graph and vector store.
 
-        """Adds or updates an entity in the graph and vector store."""
-        
-        # Add to Graph
-        if not self.graph.has_node(name):
-            self.graph.add_node(name, type=type, description=description)
-        else:
-            # Update description (simple append for now, could be smarter)
-            old_desc = self.graph.nodes[name].get('description', '')
-            if description not in old_desc:
-                self.graph.nodes[name]['description'] = old_desc + "; " + description
-        
-        # Add to Vector Store (Embedding the description + name for context)
-        text_representation = f"{name} ({type}): {description}"
-        embedding = self.embedding_fn.embed_query(text_representation)
-        
+        Thin wrapper over add_entities_bulk so one-off and batched writes
+        share the same merge/embed/upsert logic."""
+        self.add_entities_bulk([{"name": name, "type": type, "description": description}])
+
+    def add_entities_bulk(self, entities: list):
+        """Bulk version of add_entity.
+
+        Merges all entities into the graph first (deduping repeated names within
+        the batch), then does ONE batched embedding call, ONE Chroma upsert and
+        ONE graph save instead of paying those costs per entity.
+        Each item is a dict: { "name": ..., "type": ..., "description": ... }
+        """
+        if not entities:
+            return
+
+        # 1. Merge into Graph (dedupes by name, same append logic as add_entity)
+        touched = {}
+        for entity in entities:
+            name = entity["name"]
+            type_ = entity.get("type", "Unknown")
+            description = entity.get("description", "")
+
+            if not self.graph.has_node(name):
+                self.graph.add_node(name, type=type_, description=description)
+            else:
+                old_desc = self.graph.nodes[name].get('description', '')
+                if description and description not in old_desc:
+                    self.graph.nodes[name]['description'] = old_desc + "; " + description
+            touched[name] = None
+
+        # 2. Embed the merged node state in one batch call
+        ids = []
+        documents = []
+        metadatas = []
+        for name in touched:
+            node_data = self.graph.nodes[name]
+            type_ = node_data.get('type', 'Unknown')
+            desc = node_data.get('description', '')
+            ids.append(name)
+            documents.append(f"{name} ({type_}): {desc}")
+            metadatas.append({"name": name, "type": type_, "content_hash": content_hash(type_, desc)})
+            self._log_change("add_node", {"id": name, "type": type_, "description": desc})
+
+        embeddings = quantize_fp16_batch(self.embedding_fn.embed_documents(documents))
         self.collection.upsert(
-            ids=[name], # ID is the entity name for uniqueness
-            embeddings=[embedding],
-            documents=[text_representation],
-            metadatas=[{"name": name, "type": type}]
+            ids=ids,
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadatas
         )
         self.save_graph()
 
+    def add_relations_bulk(self, relations: list):
+        """Bulk version of add_relation.
+
+        Auto-creates missing endpoint entities in one batch, adds all edges and
+        saves the graph once. Each item is a dict:
+        { "source": ..., "target": ..., "relation": ... }
+        """
+        if not relations:
+            return
+
+        # Ensure endpoint nodes exist (batched, one embedding call for all)
+        missing = {}
+        for rel in relations:
+            for endpoint in (rel["source"], rel["target"]):
+                if not self.graph.has_node(endpoint) and endpoint not in missing:
+                    missing[endpoint] = {"name": endpoint, "type": "Unknown", "description": "Inferred entity"}
+        if missing:
+            self.add_entities_bulk(list(missing.values()))
+
+        for rel in relations:
+            self.graph.add_edge(rel["source"], rel["target"], relation=rel["relation"])
+            self._log_change("add_edge", {"source": rel["source"], "target": rel["target"],
+                                          "relation": rel["relation"]})
+        self.save_graph()
+
     def update_entity(self, name: str, type: str = None, description: str = None):
         """Updates an existing entity's properties (overwrite)."""
         if not self.graph.has_node(name):
             return False
-            
+
+        node = self.graph.nodes[name]
+        # No-op update: nothing changed, skip the re-embed + upsert + save
+        if ((type is None or node.get('type') == type)
+                and (description is None or node.get('description') == description)):
+            return True
+
         if type:
-            self.graph.nodes[name]['type'] = type
+            node['type'] = type
         if description:
-            self.graph.nodes[name]['description'] = description
-            
+            node['description'] = description
+
         # Re-embed
         node_data = self.graph.nodes[name]
         current_type = node_data.get('type', 'Unknown')
         current_desc = node_data.get('description', '')
         
         text_representation = f"{name} ({current_type}): {current_desc}"
-        embedding = self.embedding_fn.embed_query(text_representation)
+        embedding = self._embed(text_representation)
         
         self.collection.upsert(
             ids=[name],
             embeddings=[embedding],
             documents=[text_representation],
-            metadatas=[{"name": name, "type": current_type}]
+            metadatas=[{"name": name, "type": current_type,
+                        "content_hash": content_hash(current_type, current_desc)}]
         )
+        self._log_change("add_node", {"id": name, "type": current_type, "description": current_desc})
         self.save_graph()
         return True
 
     def add_relation(self, source: str, target: str, relation: str):
-        """Adds a relationship between two entities."""
-        # Ensure nodes exist
-        if not self.graph.has_node(source):
-            self.add_entity(source, "Unknown", "Inferred entity")
-        if not self.graph.has_node(target):
-            self.add_entity(target, "Unknown", "Inferred entity")
-            
-        self.graph.add_edge(source, target, relation=relation)
-        self.save_graph()
+        """Adds a relationship between two entities.
+
+        Thin wrapper over add_relations_bulk: missing endpoints are created in
+        one batch and the graph is saved once, instead of the old path's
+        save per auto-created endpoint plus one for the edge."""
+        self.add_relations_bulk([{"source": source, "target": target, "relation": relation}])
 
     def update_relation(self, source: str, target: str, new_relation: str):
         """Updates an existing relationship (edge)."""
@@ -336,6 +612,7 @@ class GraphMemory:
             return False
             
         self.graph[source][target]['relation'] = new_relation
+        self._log_change("add_edge", {"source": source, "target": target, "relation": new_relation})
         self.save_graph()
         return True
 
@@ -344,6 +621,7 @@ class GraphMemory:
         # 1. Remove from Graph
         if self.graph.has_node(name):
             self.graph.remove_node(name)
+            self._log_change("remove_node", {"id": name})
             self.save_graph()
             
         # 2. Remove from Vector Store
@@ -356,37 +634,45 @@ class GraphMemory:
         """Deletes a relationship between two entities."""
         if self.graph.has_edge(source, target):
             self.graph.remove_edge(source, target)
+            self._log_change("remove_edge", {"source": source, "target": target})
             self.save_graph()
 
-    def retrieve_context(self, query: str, k: int = 3, depth: int = 1, include_descriptions: bool = False) -> str:
-        """Retrieves relevant subgraph context based on vector similarity and traversal depth."""
-        query_embedding = self.embedding_fn.embed_query(query)
+    def retrieve_context(self, query: str, k: int = 3, depth: int = 1, include_descriptions: bool = False,
+                         max_distance: float = 0.8) -> str:
+        """Retrieves relevant subgraph context based on vector similarity and traversal depth.
+
+        Hits with cosine distance above max_distance are dropped before the
+        BFS so off-topic queries don't fan out across unrelated subgraphs."""
+        query_embedding = self._embed(query)
         results = self.collection.query(
             query_embeddings=[query_embedding],
-            n_results=k
+            n_results=k,
+            include=["distances"]
         )
-        
+
         if not results['ids'][0]:
             print("DEBUG: No relevant embeddings found.")
             return ""
 
         print(f"DEBUG: Found {len(results['ids'][0])} relevant nodes in vector store. Traversal Depth: {depth}")
-        
+
         # BFS Traversal
         visited = set()
-        queue = []
-        
+        queue = deque()
+
         # Initialize queue with found entities (Depth 0)
-        for entity_id in results['ids'][0]:
-            if self.graph.has_node(entity_id):
+        distances = results.get('distances') or [[0.0] * len(results['ids'][0])]
+        for entity_id, dist in zip(results['ids'][0], distances[0]):
+            if dist <= max_distance and self.graph.has_node(entity_id):
                 queue.append((entity_id, 0))
                 visited.add(entity_id)
 
         context_lines = []
-        
+        adj = self._get_adj()
+
         # Process Queue
         while queue:
-            current_id, current_dist = queue.pop(0)
+            current_id, current_dist = queue.popleft()
             
             # 1. Expand current node
             node_data = self.graph.nodes[current_id]
@@ -397,12 +683,9 @@ class GraphMemory:
             if current_dist >= depth:
                 continue
             
-            # 2. Get Neighbors
-            neighbors = list(self.graph.neighbors(current_id))
-            for neighbor in neighbors:
-                edge_data = self.graph.get_edge_data(current_id, neighbor)
-                relation = edge_data.get('relation')
-                
+            # 2. Get Neighbors (compact adjacency; pre-sorted so repeat queries
+            # yield byte-identical context, which keeps prompt caches warm)
+            for neighbor, relation in adj.get(current_id, ()):
                 # Add relationship context
                 context_lines.append(f"  - Related to {neighbor} via '{relation}'")
                 
@@ -448,15 +731,19 @@ class GraphMemory:
             
             # 2. Vector similarity search
             try:
-                query_embedding = self.embedding_fn.embed_query(query)
+                query_embedding = self._embed(query)
                 results = self.collection.query(
                     query_embeddings=[query_embedding],
-                    n_results=k
+                    n_results=k,
+                    include=["distances"]
                 )
-                
+
                 if results['ids'] and results['ids'][0]:
-                    for eid in results['ids'][0]:
-                        if self.graph.has_node(eid) and eid not in starting_nodes:
+                    distances = results.get('distances') or [[0.0] * len(results['ids'][0])]
+                    for eid, dist in zip(results['ids'][0], distances[0]):
+                        # Same pruning as retrieve_context: weak matches
+                        # aren't worth a BFS fan-out
+                        if dist <= 0.8 and self.graph.has_node(eid) and eid not in starting_nodes:
                             starting_nodes.append(eid)
             except Exception as e:
                 print(f"Vector search error: {e}")
@@ -475,7 +762,7 @@ class GraphMemory:
         
         # BFS Traversal
         visited = set()
-        queue = []
+        queue = deque()
         
         # Initialize queue with found entities (Depth 0)
         for entity_id in starting_nodes:
@@ -483,10 +770,11 @@ class GraphMemory:
             visited.add(entity_id)
 
         context_lines = []
-        
+        adj = self._get_adj()
+
         # Process Queue
         while queue:
-            current_id, current_dist = queue.pop(0)
+            current_id, current_dist = queue.popleft()
             
             # Track this node
             retrieved_nodes.append(current_id)
@@ -500,11 +788,11 @@ class GraphMemory:
             if current_dist >= depth:
                 continue
             
-            # 2. Get Neighbors
-            neighbors = list(self.graph.neighbors(current_id))
-            for neighbor in neighbors:
-                edge_data = self.graph.get_edge_data(current_id, neighbor)
-                relation = edge_data.get('relation', 'related')
+            # 2. Get Neighbors (compact adjacency; pre-sorted so repeat queries
+            # yield byte-identical context, which keeps prompt caches warm)
+            for neighbor, relation in adj.get(current_id, ()):
+                if relation is None:
+                    relation = 'related'
                 
                 # Track this edge
                 retrieved_edges.append({
@@ -528,17 +816,115 @@ class GraphMemory:
         }
 
     def get_graph_data(self):
-        """Returns graph data in a format suitable for visualization."""
-        return nx.node_link_data(self.graph)
+        """Returns graph data in a format suitable for visualization.
+
+        The node-link dict is memoized per version so the polling /graph
+        endpoint doesn't re-serialize an unchanged graph; callers must treat
+        the result as read-only."""
+        if self._node_link_cache and self._node_link_cache[0] == self.version:
+            return self._node_link_cache[1]
+        data = nx.node_link_data(self.graph)
+        self._node_link_cache = (self.version, data)
+        return data
+
+    def _log_change(self, op: str, payload: dict):
+        """Records a mutation ("add_node"/"remove_node"/"add_edge"/"remove_edge")
+        in the changelog and bumps the version."""
+        self.version += 1
+        self.changelog.append((self.version, op, payload))
+        self._adj = None
+        self._journal_append(op, payload)
+
+    def _get_adj(self):
+        """Compact adjacency map: node -> [(neighbor, relation), ...].
+
+        BFS over plain lists of tuples avoids NetworkX's dict-of-dicts
+        overhead per visited edge; rebuilt lazily after any mutation.
+        Neighbor lists are sorted so repeat retrievals stay byte-identical.
+        """
+        if self._adj is None:
+            adj = {}
+            for u, v, data in self.graph.edges(data=True):
+                rel = data.get('relation')
+                adj.setdefault(u, []).append((v, rel))
+                adj.setdefault(v, []).append((u, rel))
+            for lst in adj.values():
+                lst.sort()
+            self._adj = adj
+        return self._adj
+
+    def get_graph_delta(self, since_version: int, epoch: str = None):
+        """Returns the changes after since_version, compacted (an add followed
+        by a remove cancels out). Returns None when the delta can't be
+        trusted — unknown/foreign epoch, version out of range, or the
+        changelog no longer reaching back — and the client should re-fetch
+        the full graph."""
+        # Version numbers only mean anything within one process lifetime:
+        # a client resuming from a previous process could hold a version
+        # that happens to be in range of the new history and silently miss
+        # everything the old process did after its last poll
+        if epoch != self.epoch:
+            return None
+        if since_version > self.version:
+            return None
+        if since_version == self.version:
+            return {"version": self.version, "epoch": self.epoch,
+                    "added_nodes": [], "removed_nodes": [],
+                    "added_edges": [], "removed_edges": []}
+
+        # Ring buffer may have dropped the entries the client needs
+        if not self.changelog or self.changelog[0][0] > since_version + 1:
+            return None
+
+        added_nodes = {}
+        removed_nodes = set()
+        added_edges = {}
+        removed_edges = set()
+        for v, op, payload in self.changelog:
+            if v <= since_version:
+                continue
+            if op == "add_node":
+                added_nodes[payload["id"]] = payload
+                removed_nodes.discard(payload["id"])
+            elif op == "remove_node":
+                added_nodes.pop(payload["id"], None)
+                removed_nodes.add(payload["id"])
+            elif op == "add_edge":
+                key = (payload["source"], payload["target"])
+                added_edges[key] = payload
+                removed_edges.discard(key)
+            elif op == "remove_edge":
+                key = (payload["source"], payload["target"])
+                added_edges.pop(key, None)
+                removed_edges.add(key)
+
+        return {
+            "version": self.version,
+            "epoch": self.epoch,
+            "added_nodes": list(added_nodes.values()),
+            "removed_nodes": sorted(removed_nodes),
+            "added_edges": list(added_edges.values()),
+            "removed_edges": [{"source": s, "target": t} for s, t in sorted(removed_edges)],
+        }
 
     def clear(self):
         self.graph.clear()
-        self.save_graph()
-        self.chroma_client.delete_collection("entity_embeddings")
-        self.collection = self.chroma_client.get_or_create_collection(
-            name="entity_embeddings",
-            metadata={"hnsw:space": "cosine"}
-        )
+        # A wipe can't be expressed as a delta; drop the changelog so stale
+        # clients fall back to a full fetch
+        self.version += 1
+        self.changelog.clear()
+        self._adj = None
+        # Snapshot immediately so stale journal entries can't resurrect the
+        # wiped graph on replay
+        self._write_graph(durable=True)
+        if VECTOR_BACKEND == "faiss":
+            self.collection.delete(ids=self.collection.get()['ids'])
+        else:
+            self.chroma_client.delete_collection("entity_embeddings")
+            self.collection = self.chroma_client.get_or_create_collection(
+                name="entity_embeddings",
+                metadata={"hnsw:space": "cosine"}
+            )
 
     def get_stats(self):
         return {
@@ -559,10 +945,11 @@ class GraphMemory:
         
         # 2. Then, do semantic search via ChromaDB
         try:
-            query_embedding = self.embedding_fn.embed_query(topic)
+            query_embedding = self._embed(topic)
             results = self.collection.query(
                 query_embeddings=[query_embedding],
-                n_results=n
+                n_results=n,
+                include=[]  # only the ids are used
             )
             
             if results['ids'] and results['ids'][0]:
@@ -575,15 +962,18 @@ class GraphMemory:
         return list(results_set)[:n]
 
     def get_random_nodes(self, n: int = 3):
-        """Returns n random nodes from the graph."""
-        nodes = list(self.graph.nodes())
-        if not nodes:
-             return []
+        """Returns n random nodes via reservoir sampling (Algorithm R), so
+        the full node list is never materialized."""
         import random
-        # Ensure we don't pick more than exist
-        if n > len(nodes):
-            n = len(nodes)
-        return random.sample(nodes, n)
+        reservoir = []
+        for i, node_id in enumerate(self.graph.nodes()):
+            if i < n:
+                reservoir.append(node_id)
+            else:
+                j = random.randint(0, i)
+                if j < n:
+                    reservoir[j] = node_id
+        return reservoir
 
 
 
@@ -593,50 +983,54 @@ class GraphMemory:
         Useful after importing a graph file externally.
         """
         print(f"Re-indexing graph for workspace {self.workspace_id}...")
-        
-        # 1. Clear existing collection
+
+        # Incremental sync: wiping and re-inserting everything forced a full
+        # HNSW rebuild. Instead, diff the collection against the graph and
+        # only delete stale ids / re-embed new or changed nodes (tracked via
+        # the content_hash stored in metadata).
+        existing_hashes = {}
         try:
-            # Get all IDs to delete
-            existing = self.collection.get()
-            if existing and existing['ids']:
-                print(f"Deleting {len(existing['ids'])} existing embeddings...")
-                self.collection.delete(ids=existing['ids'])
+            existing = self.collection.get(include=["metadatas"])
+            for i, eid in enumerate(existing['ids']):
+                meta = existing['metadatas'][i] if existing['metadatas'] else {}
+                existing_hashes[eid] = (meta or {}).get('content_hash')
         except Exception as e:
-            print(f"Error clearing collection (might be empty): {e}")
+            print(f"Error reading collection (might be empty): {e}")
+
+        current = set(self.graph.nodes())
+
+        # 1. Drop embeddings for nodes no longer in the graph
+        to_delete = [eid for eid in existing_hashes if eid not in current]
+        if to_delete:
+            print(f"Deleting {len(to_delete)} stale embeddings...")
+            try:
+                self.collection.delete(ids=to_delete)
+            except Exception as e:
+                print(f"Error deleting stale embeddings: {e}")
 
-        # 2. Re-embed all nodes
-        nodes_to_add = []
+        # 2. Embed only new or changed nodes
         ids = []
-        embeddings = []
-        metadatas = []
         documents = []
-        
-        # Batch preparation
-        # We'll do it in one go for small graphs, or chunk it?
-        # Graph size < 2000 nodes usually. One go is fine?
-        # Chroma handles batching internally mostly, but let's be safe.
-        
-        nodes = list(self.graph.nodes(data=True))
-        print(f"Found {len(nodes)} nodes to index.")
-        
-        if not nodes:
-            return
-
-        for name, data in nodes:
+        metadatas = []
+        for name, data in self.graph.nodes(data=True):
             desc = data.get('description', '')
             type_ = data.get('type', 'Unknown')
-            
-            text_representation = f"{name} ({type_}): {desc}"
-            # We defer embedding to the batch call? 
-            # `embedding_fn.embed_documents` takes a list.
-            
+            chash = content_hash(type_, desc)
+            if existing_hashes.get(name) == chash:
+                continue
             ids.append(name)
-            documents.append(text_representation)
-            metadatas.append({"name": name, "type": type_})
-        
+            documents.append(f"{name} ({type_}): {desc}")
+            metadatas.append({"name": name, "type": type_, "content_hash": chash})
+
+        print(f"Found {len(ids)} new/changed nodes to index ({len(current)} total).")
+
+        if not ids:
+            print("Re-indexing complete (collection already in sync).")
+            return
+
         # Generate Embeddings in batch (faster)
         try:
-            embeddings = self.embedding_fn.embed_documents(documents)
+            embeddings = quantize_fp16_batch(self.embedding_fn.embed_documents(documents))
             
             # Upsert
             # Chroma max batch size is usually ~5000+. 
@@ -725,65 +1119,91 @@ class GraphMemory:
         if self.graph.number_of_nodes() == 0:
             return []
 
-        # Calculate degree centrality
-        centrality = nx.degree_centrality(self.graph)
-        
-        # Sort by centrality (descending)
-        sorted_nodes = sorted(centrality.items(), key=lambda x: x[1], reverse=True)
-        
-        # Take top N
-        top_nodes = sorted_nodes[:limit]
-        
+        # The endpoint is polled far more often than the graph mutates;
+        # compute the top 100 (the router's limit cap) once per version and
+        # slice on repeat calls
+        cached = self._hot_topics_cache
+        if cached and cached[0] == self.version:
+            return cached[1][:limit]
+
+        # Top-k by degree directly: nx.degree_centrality builds a full
+        # {node: score} dict and a full sort just to take the head. O(N log k)
+        # with the same normalization (degree / (N - 1)).
+        n = self.graph.number_of_nodes() - 1 or 1
+        top_nodes = heapq.nlargest(100, self.graph.degree(), key=lambda x: x[1])
+
         results = []
-        for node_id, score in top_nodes:
+        for node_id, degree in top_nodes:
             node_data = self.graph.nodes[node_id]
-            degree = self.graph.degree[node_id]
             results.append({
                 "id": node_id,
                 "type": node_data.get("type", "Unknown"),
                 "description": node_data.get("description", ""),
-                "centrality": score,
+                "centrality": degree / n,
                 "degree": degree
             })
-            
-        return results
+
+        self._hot_topics_cache = (self.version, results)
+        return results[:limit]
 
     def get_connectors(self, limit: int = 10, sample_size: int = None, normalize: bool = True):
         """
         Returns top nodes sorted by betweenness centrality (connectors).
         :param limit: Number of top nodes to return.
-        :param sample_size: Number of nodes to sample for centrality calculation (k). 
+        :param sample_size: Number of nodes to sample for centrality calculation (k).
                             If None or larger than graph, use full graph.
         :param normalize: If True, normalize by degree for per-connection bridging score.
+
+        Graphs over 500 nodes default to sampled Brandes (k pivots), so the
+        scores are a ranking approximation rather than exact betweenness.
         """
         if self.graph.number_of_nodes() == 0:
             return []
 
-        # Validate sample_size
+        # Validate sample_size; for large graphs default to sampled
+        # approximation since exact betweenness is O(V*E)
+        n = self.graph.number_of_nodes()
         k = sample_size
-        if k is not None and k >= self.graph.number_of_nodes():
+        if k is None and n > 500:
+            k = min(n, int(math.log(n) * 50))
+        if k is not None and k >= n:
             k = None
 
-        # Calculate betweenness centrality
+        # Calculate betweenness centrality (the most expensive analytic here,
+        # so cache per graph version — any mutation bumps self.version)
         # k=None means exact, k=int means approximation
-        centrality = nx.betweenness_centrality(self.graph, k=k)
-        
-        if normalize:
-            # Normalize by degree to get "per-connection bridging score"
-            # This highlights nodes that are efficient bridges relative to their connectivity
-            normalized_centrality = {}
-            for node_id, bc_score in centrality.items():
-                degree = self.graph.degree[node_id]
-                if degree > 0:
-                    normalized_centrality[node_id] = bc_score / degree
-                # Skip nodes with 0 degree (isolated nodes)
-            
-            # Sort by normalized centrality (descending)
-            sorted_nodes = sorted(normalized_centrality.items(), key=lambda x: x[1], reverse=True)
-        else:
-            # Use raw betweenness centrality
-            sorted_nodes = sorted(centrality.items(), key=lambda x: x[1], reverse=True)
+        cache_key = (self.version, k)
+        centrality = self._centrality_cache.get(cache_key)
+        if centrality is None:
+            centrality = nx.betweenness_centrality(self.graph, k=k, seed=42)
+            # Keep only the latest result; older versions are dead weight
+            self._centrality_cache = {cache_key: centrality}
         
+        # The normalize + full sort is also repeated work between mutations;
+        # cache the sorted list alongside the centrality scores
+        sort_key = (self.version, k, normalize)
+        sorted_nodes = self._connectors_cache.get(sort_key)
+        if sorted_nodes is None:
+            if normalize:
+                # Normalize by degree to get "per-connection bridging score"
+                # This highlights nodes that are efficient bridges relative to their connectivity
+                normalized_centrality = {}
+                for node_id, bc_score in centrality.items():
+                    degree = self.graph.degree[node_id]
+                    if degree > 0:
+                        normalized_centrality[node_id] = bc_score / degree
+                    # Skip nodes with 0 degree (isolated nodes)
+
+                # Sort by normalized centrality (descending)
+                sorted_nodes = sorted(normalized_centrality.items(), key=lambda x: x[1], reverse=True)
+            else:
+                # Use raw betweenness centrality
+                sorted_nodes = sorted(centrality.items(), key=lambda x: x[1], reverse=True)
+            # Keep only the latest version's results
+            self._connectors_cache = {key: val for key, val in self._connectors_cache.items()
+                                      if key[0] == self.version}
+            self._connectors_cache[sort_key] = sorted_nodes
+
         # Take top N
         top_nodes = sorted_nodes[:limit]
         
@@ -815,17 +1235,12 @@ class GraphMemory:
         if node_count < min_nodes:
             return []
         
-        # Get all nodes with their degrees
-        node_degrees = [(node_id, self.graph.degree[node_id]) for node_id in self.graph.nodes()]
-        
-        # Filter to only low-connectivity nodes
-        low_connectivity = [(node_id, degree) for node_id, degree in node_degrees if degree <= max_degree]
-        
-        # Sort by degree (ascending) - lowest connectivity first
-        low_connectivity.sort(key=lambda x: x[1])
-        
-        # Take top N gaps
-        gaps = low_connectivity[:limit]
+        # Bottom-k low-connectivity nodes without a full sort
+        gaps = heapq.nsmallest(
+            limit,
+            ((node_id, degree) for node_id, degree in self.graph.degree() if degree <= max_degree),
+            key=lambda x: x[1]
+        )
         
         results = []
         for node_id, degree in gaps:
@@ -838,3 +1253,42 @@ class GraphMemory:
             })
         
         return results
+
+
+def get_memory(workspace_id: str) -> GraphMemory:
+    """
+    Returns a shared per-workspace GraphMemory instance.
+
+    Constructing GraphMemory re-reads graph.json and re-opens the Chroma
+    client, which hot endpoints were paying on every request. Sharing one
+    instance per workspace also keeps readers and writers on the same
+    in-memory graph.
+    """
+    if not WORKSPACE_ID_RE.match(workspace_id):
+        raise ValueError(f"Invalid workspace_id: {workspace_id!r}")
+    mem = _memory_cache.get(workspace_id)
+    if mem is None:
+        with _memory_cache_lock:
+            mem = _memory_cache.get(workspace_id)
+            if mem is None:
+                mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+                _memory_cache[workspace_id] = mem
+    return mem
+
+
+def evict_memory(workspace_id: str):
+    """Drops the cached instance after a workspace is deleted, renamed or its
+    graph file is replaced externally (e.g. import)."""
+    with _memory_cache_lock:
+        _memory_cache.pop(workspace_id, None)
+
+
+def flush_all():
+    """Durably writes every dirty cached graph. App shutdown hook."""
+    with _memory_cache_lock:
+        mems = list(_memory_cache.values())
+    for mem in mems:
+        try:
+            mem.flush()
+        except Exception as e:
+            print(f"Error flushing graph for '{mem.workspace_id}': {e}")
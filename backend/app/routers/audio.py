@@ -1,15 +1,55 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import httpx
+import logging
 from app.llm_config import llm_config
 
+# Child of the queue-backed "mycelium" logger from main.py: records are
+# handed off to the listener thread instead of blocking on stdout
+logger = logging.getLogger("mycelium.audio")
+
 router = APIRouter(prefix="/audio", tags=["audio"])
 
+
+def _build_wav_header():
+    # WAV Header for 24kHz, 16-bit, mono (44 bytes)
+    import struct
+
+    sample_rate = 24000
+    num_channels = 1
+    bits_per_sample = 16
+    byte_rate = sample_rate * num_channels * (bits_per_sample // 8)
+    block_align = num_channels * (bits_per_sample // 8)
+
+    # Set data size to a large number (approx 100MB) for streaming
+    # Browsers usually handle "incorrect" lengths fine for playback
+    data_size = 100 * 1024 * 1024
+    chunk_size = 36 + data_size
+
+    header = b'RIFF'
+    header += struct.pack('<I', chunk_size)
+    header += b'WAVE'
+    header += b'fmt '
+    header += struct.pack('<I', 16) # Subchunk1Size
+    header += struct.pack('<H', 1)  # AudioFormat (1=PCM)
+    header += struct.pack('<H', num_channels)
+    header += struct.pack('<I', sample_rate)
+    header += struct.pack('<I', byte_rate)
+    header += struct.pack('<H', block_align)
+    header += struct.pack('<H', bits_per_sample)
+    header += b'data'
+    header += struct.pack('<I', data_size)
+    return header
+
+# Fully constant; build once at import instead of per request
+_WAV_HEADER_24K_MONO_16 = _build_wav_header()
+
+
 class SpeechRequest(BaseModel):
     input: str
 
-async def _stream_tts(text: str):
+async def _stream_tts(text: str, client: httpx.AsyncClient):
     cfg = llm_config.get_config()
     
     if not hasattr(cfg, 'tts_enabled') or not cfg.tts_enabled:
@@ -24,62 +64,40 @@ async def _stream_tts(text: str):
         "response_format": "pcm"
     }
 
-    def create_wav_header():
-        # WAV Header for 24kHz, 16-bit, mono
-        # 44 bytes
-        import struct
-        
-        sample_rate = 24000
-        num_channels = 1
-        bits_per_sample = 16
-        byte_rate = sample_rate * num_channels * (bits_per_sample // 8)
-        block_align = num_channels * (bits_per_sample // 8)
-        
-        # Set data size to a large number (approx 100MB) for streaming
-        # Browsers usually handle "incorrect" lengths fine for playback
-        data_size = 100 * 1024 * 1024 
-        chunk_size = 36 + data_size
-        
-        header = b'RIFF'
-        header += struct.pack('<I', chunk_size)
-        header += b'WAVE'
-        header += b'fmt '
-        header += struct.pack('<I', 16) # Subchunk1Size
-        header += struct.pack('<H', 1)  # AudioFormat (1=PCM)
-        header += struct.pack('<H', num_channels)
-        header += struct.pack('<I', sample_rate)
-        header += struct.pack('<I', byte_rate)
-        header += struct.pack('<H', block_align)
-        header += struct.pack('<H', bits_per_sample)
-        header += b'data'
-        header += struct.pack('<I', data_size)
-        return header
-
     async def iter_audio():
         # ... (httpx logic) implementation below
         pass
 
-    # Improved implementation:
-    client = httpx.AsyncClient(timeout=None)
+    # Improved implementation (client is the shared app.state.http pool,
+    # so only the streamed response is closed here):
     req = client.build_request("POST", url, json=payload)
     response = await client.send(req, stream=True)
-    
+
     if response.status_code != 200:
         await response.aread() # Read error body
-        print(f"TTS Error: {response.text}")
-        await client.aclose()
+        logger.error("TTS Error: %s", response.text)
         raise HTTPException(status_code=response.status_code, detail=f"TTS Provider Error: {response.text}")
 
-    print(f"DEBUG: Wrapping PCM stream in WAV header (assuming 24kHz)")
+    logger.debug("Wrapping PCM stream in WAV header (assuming 24kHz)")
 
     async def stream_response():
+        # 1 KiB chunks meant ~47 yields/sec of 24kHz PCM, each a separate
+        # ASGI send. Ship a small first chunk so the browser starts playback
+        # quickly, then coalesce to 16 KiB (~340ms of audio) for the rest.
         try:
-            yield create_wav_header()
-            async for chunk in response.aiter_bytes(chunk_size=1024):
-                yield chunk
+            yield _WAV_HEADER_24K_MONO_16
+            buf = bytearray()
+            target = 4096
+            async for chunk in response.aiter_raw():
+                buf += chunk
+                if len(buf) >= target:
+                    yield bytes(buf)
+                    buf.clear()
+                    target = 16384
+            if buf:
+                yield bytes(buf)
         finally:
             await response.aclose()
-            await client.aclose()
 
     return StreamingResponse(
         stream_response(),
@@ -87,9 +105,9 @@ async def _stream_tts(text: str):
     )
 
 @router.post("/speech")
-async def generate_speech(request: SpeechRequest):
-    return await _stream_tts(request.input)
+async def generate_speech(request: SpeechRequest, http_request: Request):
+    return await _stream_tts(request.input, http_request.app.state.http)
 
 @router.get("/stream")
-async def stream_speech(input: str):
-    return await _stream_tts(input)
+async def stream_speech(input: str, http_request: Request):
+    return await _stream_tts(input, http_request.app.state.http)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
-import json
+import asyncio
+from fastapi import APIRouter, HTTPException, Path
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
+from app import fast_json
+from app.memory_store import WORKSPACE_ID_RE, WORKSPACE_ID_PATTERN
 from app.services.concept_service import ConceptService
 
 router = APIRouter(prefix="/concepts", tags=["concepts"])
@@ -14,22 +16,54 @@ class GenerateRequest(BaseModel):
     min_cluster_size: int = 5
 
 @router.get("/{workspace_id}")
-async def get_concepts(workspace_id: str):
+async def get_concepts(workspace_id: str = Path(pattern=WORKSPACE_ID_PATTERN)):
     """Get existing concepts for a workspace."""
     service = ConceptService(workspace_id)
-    return service.get_concepts()
+    # Already a plain list of dicts from disk; skip the jsonable_encoder walk
+    return ORJSONResponse(service.get_concepts())
 
 @router.post("/generate")
 async def generate_concepts(request: GenerateRequest):
     """Trigger generation of concepts, streaming results as NDJSON."""
+    # Body param, so no Path(pattern=...): reject junk ids here rather than
+    # letting get_memory's ValueError surface as a 500
+    if not WORKSPACE_ID_RE.match(request.workspace_id):
+        raise HTTPException(status_code=400, detail="Invalid workspace_id")
     service = ConceptService(request.workspace_id)
     
     async def generator():
-        async for concept in service.generate_concepts_stream(
+        # Coalesce NDJSON lines: each yield is a separate ASGI send + socket
+        # write, so buffer up to 8 KiB. Buffered lines are flushed after 50ms
+        # without a new concept, keeping progress updates timely. The pending
+        # __anext__ task survives flush timeouts (asyncio.wait doesn't cancel
+        # it, unlike wait_for).
+        agen = service.generate_concepts_stream(
             resolution=request.resolution,
             max_clusters=request.max_clusters,
             min_cluster_size=request.min_cluster_size
-        ):
-            yield json.dumps(concept) + "\n"
+        ).__aiter__()
+
+        buf = bytearray()
+        pending = None
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(agen.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=0.05 if buf else None)
+            if not done:
+                yield bytes(buf)
+                buf.clear()
+                continue
+            task, pending = pending, None
+            try:
+                concept = task.result()
+            except StopAsyncIteration:
+                break
+            buf += fast_json.dumps_bytes(concept)
+            buf += b"\n"
+            if len(buf) >= 8192:
+                yield bytes(buf)
+                buf.clear()
+        if buf:
+            yield bytes(buf)
 
     return StreamingResponse(generator(), media_type="application/x-ndjson")
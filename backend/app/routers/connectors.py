@@ -1,12 +1,13 @@
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, HTTPException, Path, Query
 from typing import List, Optional
-from app.memory_store import GraphMemory
+from app.memory_store import get_memory, WORKSPACE_ID_PATTERN
 
 router = APIRouter(prefix="/connectors", tags=["connectors"])
 
 @router.get("/{workspace_id}")
 async def get_connectors(
-    workspace_id: str,
+    workspace_id: str = Path(pattern=WORKSPACE_ID_PATTERN),
     limit: int = Query(10, ge=1, le=100),
     sample_size: Optional[int] = Query(None, ge=1, le=5000, description="Approximate with k nodes to improve speed"),
     normalize: bool = Query(True, description="Normalize by degree for per-connection bridging score")
@@ -14,9 +15,13 @@ async def get_connectors(
     """
     Get top nodes sorted by betweenness centrality (connectors).
     """
-    memory = GraphMemory(workspace_id=workspace_id)
+    memory = get_memory(workspace_id)
     try:
-        return memory.get_connectors(limit=limit, sample_size=sample_size, normalize=normalize)
+        # Betweenness is pure synchronous graph traversal; keep it off the
+        # event loop so other handlers aren't blocked while it runs
+        return await asyncio.to_thread(
+            memory.get_connectors, limit=limit, sample_size=sample_size, normalize=normalize
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
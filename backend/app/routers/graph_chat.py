@@ -1,14 +1,60 @@
 from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-import json
+import networkx as nx
 from langchain_core.messages import HumanMessage, AIMessage
-from app.memory_store import GraphMemory
+from app import fast_json
+from app.memory_store import get_memory
 from app.llm_config import llm_config
 
+import logging
+
+logger = logging.getLogger("mycelium.graph_chat")
+
 router = APIRouter(prefix="/graph", tags=["graph_chat"])
 
+import os
+
+# Per-workspace config cache keyed by mtime: the file changes rarely but was
+# re-read and re-parsed on every chat turn
+_ws_config_cache = {}
+
+
+def _load_ws_config(workspace_id: str) -> dict:
+    path = os.path.join("memory_data", workspace_id, "config.json")
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    cached = _ws_config_cache.get(workspace_id)
+    if cached and cached[0] == st.st_mtime:
+        return cached[1]
+    try:
+        with open(path, 'rb') as f:
+            data = fast_json.loads(f.read())
+    except Exception as e:
+        logger.error("Error loading workspace config: %s", e)
+        return {}
+    _ws_config_cache[workspace_id] = (st.st_mtime, data)
+    return data
+
+
+# Fixed pieces of the graph-chat prompt, built once; per-request work is a
+# single join over the dynamic context and question
+_PROMPT_HEAD = """You are an AI assistant helping the user explore their knowledge graph.
+The user is viewing the graph and asking about specific nodes or relationships.
+
+RELEVANT CONTEXT FROM KNOWLEDGE GRAPH:
+"""
+
+_PROMPT_TAIL = """
+
+Answer the user's question based on the context above. Be specific about the entities and relationships.
+If you don't have enough information, say so clearly.
+
+User Question: """
+
 
 class GraphChatRequest(BaseModel):
     message: str
@@ -21,35 +67,20 @@ class GraphChatRequest(BaseModel):
 async def graph_chat(workspace_id: str, request: GraphChatRequest):
     """
     Chat endpoint specifically for graph view.
-    Returns streaming response with retrieved node/edge metadata at the end.
-    
-    The stream format is:
-    - Regular text chunks for the LLM response
-    - Final line: ###GRAPH_CONTEXT###{"retrieved_nodes": [...], "retrieved_edges": [...]}
+    Returns an SSE stream with retrieved node/edge metadata at the end:
+    - "token" events carrying JSON-encoded text chunks
+    - a final "graph_context" event with {"retrieved_nodes": [...], "retrieved_edges": [...]}
     """
     
     # Initialize memory store for this workspace
-    memory_store = GraphMemory(workspace_id=workspace_id)
+    memory_store = get_memory(workspace_id)
     
     # Use request params if provided, else load from workspace config, else defaults
-    import os
-    k = request.k if request.k is not None else 3
-    depth = request.depth if request.depth is not None else 1
-    include_descriptions = True  # More verbose for graph chat
-    
-    try:
-        config_path = os.path.join("memory_data", workspace_id, "config.json")
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                ws_config = json.load(f)
-                # Only use config values if not overridden by request
-                if request.k is None:
-                    k = ws_config.get("graph_k", k)
-                if request.depth is None:
-                    depth = ws_config.get("graph_depth", depth)
-                include_descriptions = ws_config.get("graph_include_descriptions", True)
-    except Exception as e:
-        print(f"Error loading workspace config: {e}")
+    ws_config = _load_ws_config(workspace_id)
+    # Only use config values if not overridden by request
+    k = request.k if request.k is not None else ws_config.get("graph_k", 3)
+    depth = request.depth if request.depth is not None else ws_config.get("graph_depth", 1)
+    include_descriptions = ws_config.get("graph_include_descriptions", True)
     
     # Retrieve context with node tracking
     retrieval_result = memory_store.retrieve_context_with_nodes(
@@ -64,47 +95,43 @@ async def graph_chat(workspace_id: str, request: GraphChatRequest):
     retrieved_nodes = retrieval_result["retrieved_nodes"]
     retrieved_edges = retrieval_result["retrieved_edges"]
     
-    # Build system prompt with context
-    system_prompt = f"""You are an AI assistant helping the user explore their knowledge graph.
-The user is viewing the graph and asking about specific nodes or relationships.
-
-RELEVANT CONTEXT FROM KNOWLEDGE GRAPH:
-{context if context else "No relevant context found in the graph."}
-
-Answer the user's question based on the context above. Be specific about the entities and relationships.
-If you don't have enough information, say so clearly."""
-
-    # Build messages
+    # Build messages from the constant head/tail around the dynamic parts
     messages = [
-        HumanMessage(content=f"{system_prompt}\n\nUser Question: {request.message}")
+        HumanMessage(content="".join((
+            _PROMPT_HEAD,
+            context if context else "No relevant context found in the graph.",
+            _PROMPT_TAIL,
+            request.message,
+        )))
     ]
     
+    # SSE frames instead of the old ###GRAPH_CONTEXT### sentinel: the
+    # frontend dispatches on the event name rather than substring-scanning
+    # every chunk. data payloads are JSON-encoded so token newlines can't
+    # break the framing; yielding bytes skips a per-frame encode.
     async def event_generator():
-        full_response = ""
-        
         try:
             llm = llm_config.get_chat_llm()
-            
+
             # Stream the response
             for chunk in llm.stream(messages):
                 if chunk.content:
-                    full_response += chunk.content
-                    yield chunk.content
-            
+                    yield b"event: token\ndata: " + fast_json.dumps_bytes(chunk.content) + b"\n\n"
+
             # After streaming completes, append the metadata
             metadata = {
                 "retrieved_nodes": retrieved_nodes,
                 "retrieved_edges": retrieved_edges
             }
-            yield f"\n###GRAPH_CONTEXT###{json.dumps(metadata)}"
-            
+            yield b"event: graph_context\ndata: " + fast_json.dumps_bytes(metadata) + b"\n\n"
+
         except Exception as e:
-            print(f"Graph chat error: {e}")
+            logger.error("Graph chat error: %s", e)
             import traceback
             traceback.print_exc()
-            yield f"\n[Error: {str(e)}]"
-    
-    return StreamingResponse(event_generator(), media_type="text/plain")
+            yield b"event: error\ndata: " + fast_json.dumps_bytes(str(e)) + b"\n\n"
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
 @router.get("/{workspace_id}/node/{node_id}")
@@ -113,45 +140,35 @@ async def get_node_context(workspace_id: str, node_id: str, depth: int = 1):
     Get context for a specific node and its neighbors.
     Returns node details and surrounding subgraph for display.
     """
-    memory_store = GraphMemory(workspace_id=workspace_id)
+    memory_store = get_memory(workspace_id)
     
     if not memory_store.graph.has_node(node_id):
         return {"error": "Node not found", "node_id": node_id}
     
     # Get node details
     node_data = memory_store.graph.nodes[node_id]
+
+    # ego_graph replaces the hand-rolled BFS: one library traversal instead
+    # of a neighbors() + get_edge_data() call per node, and the subgraph's
+    # edge set comes out deduplicated (the old walk could emit the same edge
+    # from both endpoints)
+    sub = nx.ego_graph(memory_store.graph, node_id, radius=depth)
+    neighbors = [
+        {
+            "id": nid,
+            "type": data.get("type", "Unknown"),
+            "description": data.get("description", "")
+        }
+        for nid, data in sub.nodes(data=True) if nid != node_id
+    ]
+    edges = [
+        {"source": u, "target": v, "relation": data.get("relation", "related")}
+        for u, v, data in sub.edges(data=True)
+    ]
     
-    # Get neighbors up to depth
-    neighbors = []
-    edges = []
-    visited = {node_id}
-    queue = [(node_id, 0)]
-    
-    while queue:
-        current_id, current_depth = queue.pop(0)
-        
-        if current_depth >= depth:
-            continue
-            
-        for neighbor in memory_store.graph.neighbors(current_id):
-            edge_data = memory_store.graph.get_edge_data(current_id, neighbor)
-            edges.append({
-                "source": current_id,
-                "target": neighbor,
-                "relation": edge_data.get("relation", "related")
-            })
-            
-            if neighbor not in visited:
-                visited.add(neighbor)
-                neighbor_data = memory_store.graph.nodes[neighbor]
-                neighbors.append({
-                    "id": neighbor,
-                    "type": neighbor_data.get("type", "Unknown"),
-                    "description": neighbor_data.get("description", "")
-                })
-                queue.append((neighbor, current_depth + 1))
-    
-    return {
+    # Hub nodes at depth>=2 can produce payloads of hundreds of KB; hand the
+    # plain dicts straight to orjson instead of the jsonable_encoder walk
+    return ORJSONResponse({
         "node": {
             "id": node_id,
             "type": node_data.get("type", "Unknown"),
@@ -159,4 +176,4 @@ async def get_node_context(workspace_id: str, node_id: str, depth: int = 1):
         },
         "neighbors": neighbors,
         "edges": edges
-    }
+    })
@@ -1,18 +1,18 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Path, Query
 from typing import List, Optional
-from app.memory_store import GraphMemory
+from app.memory_store import get_memory, WORKSPACE_ID_PATTERN
 
 router = APIRouter(prefix="/hot_topics", tags=["hot_topics"])
 
 @router.get("/{workspace_id}")
 async def get_hot_topics(
-    workspace_id: str,
+    workspace_id: str = Path(pattern=WORKSPACE_ID_PATTERN),
     limit: int = Query(10, ge=1, le=100)
 ):
     """
     Get top nodes sorted by degree centrality.
     """
-    memory = GraphMemory(workspace_id=workspace_id)
+    memory = get_memory(workspace_id)
     try:
         return memory.get_hot_topics(limit=limit)
     except Exception as e:
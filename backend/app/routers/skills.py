@@ -1,11 +1,15 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
+import logging
 import os
 import json
 import uuid
 import time
-from app.memory_store import GraphMemory
+from app import fast_json
+from app.memory_store import get_memory
+
+logger = logging.getLogger("mycelium.skills")
 
 router = APIRouter(prefix="/workspaces", tags=["skills"])
 
@@ -40,23 +44,44 @@ def get_skills_dir(workspace_id: str):
     return skills_dir
 
 
-@router.get("/{workspace_id}/skills", response_model=List[Skill])
+# Parsed skill listings per workspace: (dir signature, sorted skills).
+# The signature is the set of (name, mtime_ns, size) stats, so a cached
+# listing costs one scandir + N stats instead of N open/parse round trips,
+# and stays correct across multiple workers (no cross-process invalidation
+# needed).
+_skills_cache = {}
+
+
+@router.get("/{workspace_id}/skills")
 async def list_skills(workspace_id: str):
     """List all skills in a workspace."""
     skills_dir = get_skills_dir(workspace_id)
+
+    # scandir yields dirents with the file type already populated (one
+    # syscall for the listing), and the raw dicts skip per-skill Pydantic
+    # construction — this is a read-only listing of files we wrote ourselves
+    with os.scandir(skills_dir) as it:
+        entries = [e for e in it
+                   if e.name.endswith(".json") and e.is_file(follow_symlinks=False)]
+
+    signature = frozenset(
+        (e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in entries
+    )
+    cached = _skills_cache.get(workspace_id)
+    if cached and cached[0] == signature:
+        return cached[1]
+
     skills = []
-    
-    for filename in os.listdir(skills_dir):
-        if filename.endswith(".json"):
-            try:
-                with open(os.path.join(skills_dir, filename), 'r') as f:
-                    data = json.load(f)
-                    skills.append(Skill(**data))
-            except:
-                continue
-    
+    for entry in entries:
+        try:
+            with open(entry.path, 'rb') as f:
+                skills.append(fast_json.loads(f.read()))
+        except Exception:
+            continue
+
     # Sort by updated_at desc
-    skills.sort(key=lambda s: s.updated_at, reverse=True)
+    skills.sort(key=lambda s: s.get("updated_at", 0), reverse=True)
+    _skills_cache[workspace_id] = (signature, skills)
     return skills
 
 
@@ -79,29 +104,29 @@ async def create_skill(workspace_id: str, request: CreateSkillRequest):
 
     # Sync Embedding
     try:
-        mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+        mem = get_memory(workspace_id)
         mem.index_skill(skill_id, skill.title, skill.summary, skill.explanation)
     except Exception as e:
-        print(f"Skill embedding sync failed: {e}")
+        logger.error("Skill embedding sync failed: %s", e)
         
     return skill
 
 
-@router.get("/{workspace_id}/skills/{skill_id}", response_model=Skill)
+@router.get("/{workspace_id}/skills/{skill_id}")
 async def get_skill(workspace_id: str, skill_id: str):
-    """Get a specific skill by ID."""
+    """Get a specific skill by ID (Skill-shaped dict; we wrote the file, so
+    no outgoing re-validation)."""
     skills_dir = get_skills_dir(workspace_id)
     path = os.path.join(skills_dir, f"{skill_id}.json")
-    
+
     if not os.path.exists(path):
         raise HTTPException(status_code=404, detail="Skill not found")
-        
-    with open(path, 'r') as f:
-        data = json.load(f)
-        return Skill(**data)
+
+    with open(path, 'rb') as f:
+        return fast_json.loads(f.read())
 
 
-@router.put("/{workspace_id}/skills/{skill_id}", response_model=Skill)
+@router.put("/{workspace_id}/skills/{skill_id}")
 async def update_skill(workspace_id: str, skill_id: str, request: UpdateSkillRequest):
     """Update an existing skill."""
     skills_dir = get_skills_dir(workspace_id)
@@ -127,12 +152,13 @@ async def update_skill(workspace_id: str, skill_id: str, request: UpdateSkillReq
 
     # Sync Embedding
     try:
-        mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+        mem = get_memory(workspace_id)
         mem.index_skill(skill_id, data["title"], data["summary"], data["explanation"])
     except Exception as e:
-        print(f"Skill embedding sync failed: {e}")
-        
-    return Skill(**data)
+        logger.error("Skill embedding sync failed: %s", e)
+
+    # Skill-shaped dict; fields were validated on the way in
+    return data
 
 
 @router.delete("/{workspace_id}/skills/{skill_id}")
@@ -146,10 +172,10 @@ async def delete_skill(workspace_id: str, skill_id: str):
         
         # Sync Embedding
         try:
-            mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+            mem = get_memory(workspace_id)
             mem.delete_skill_embedding(skill_id)
         except Exception as e:
-            print(f"Skill embedding sync failed: {e}")
+            logger.error("Skill embedding sync failed: %s", e)
             
         return {"status": "deleted"}
     raise HTTPException(status_code=404, detail="Skill not found")
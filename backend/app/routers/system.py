@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 from app.llm_config import llm_config, LLMConfigModel
 
 router = APIRouter(prefix="/system", tags=["system"])
@@ -26,11 +27,11 @@ async def update_system_config(config: LLMConfigModel):
     return config
 
 import httpx
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
 from typing import List, Dict
 
 @router.get("/models")
-async def get_models():
+async def get_models(request: Request):
     """Fetches available models from the configured LLM provider."""
     cfg = llm_config.get_config()
     base_url = cfg.chat_base_url.rstrip("/")
@@ -44,26 +45,30 @@ async def get_models():
     target_url = f"{base_url}/models"
     
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            headers = {}
-            if api_key:
-                headers["Authorization"] = f"Bearer {api_key}"
-            
-            resp = await client.get(target_url, headers=headers)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            # Standard OpenAI response format: { "data": [ {"id": "model-1"}, ... ] }
-            if "data" in data and isinstance(data["data"], list):
-                models = [item["id"] for item in data["data"] if "id" in item]
-                return {"models": models}
-            else:
-                return {"models": []} # Fallback
-                
+        # Shared pooled client (app.state.http): keep-alive to the provider
+        # instead of a fresh pool + handshake per call
+        client = request.app.state.http
+        headers = {}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+
+        resp = await client.get(target_url, headers=headers, timeout=5.0)
+        resp.raise_for_status()
+        data = resp.json()
+
+        # Standard OpenAI response format: { "data": [ {"id": "model-1"}, ... ] }
+        # Plain dict of primitives: return the response directly so
+        # FastAPI skips the jsonable_encoder walk
+        if "data" in data and isinstance(data["data"], list):
+            models = [item["id"] for item in data["data"] if "id" in item]
+            return ORJSONResponse({"models": models})
+        else:
+            return ORJSONResponse({"models": []}) # Fallback
+
     except Exception as e:
         print(f"Failed to fetch models: {e}")
         # Don't crash, just return empty list so UI doesn't break
-        return {"models": [], "error": str(e)}
+        return ORJSONResponse({"models": [], "error": str(e)})
 
 
 # --- MCP Server Management Endpoints ---
@@ -104,5 +109,6 @@ async def get_mcp_status():
             "connected": server.connected,
             "tool_count": len(server.tools)
         }
-    return status
+    # Skip the jsonable_encoder walk; the payload is already plain JSON types
+    return ORJSONResponse(status)
 
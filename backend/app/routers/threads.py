@@ -1,15 +1,25 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
+import asyncio
+import functools
+import mmap
 import os
-import json
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 import re
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from app.agent import app_agent
+from app import fast_json
+from app.agent import app_agent, drop_ephemeral_checkpoint
 
 from datetime import datetime
 
+import logging
+
+logger = logging.getLogger("mycelium.threads")
+
 def strip_markdown_from_title(title: str) -> str:
     """Remove common markdown syntax from a title string."""
     # Remove leading # (headers)
@@ -26,6 +36,9 @@ router = APIRouter(prefix="/threads", tags=["threads"])
 
 MEMORY_BASE_DIR = "./memory_data"
 
+# Stored role -> LangChain message class, for rebuilding history each turn
+_ROLE_CLS = {"user": HumanMessage, "assistant": AIMessage, "system": SystemMessage}
+
 class Thread(BaseModel):
     id: str
     workspace_id: str
@@ -43,7 +56,10 @@ class ChatResponse(BaseModel):
     response: str
     thread_id: str
 
+@functools.lru_cache(maxsize=1024)
 def get_thread_dir(workspace_id: str):
+    # Every endpoint resolves the directory, which used to mean a makedirs
+    # stat per request; once it exists in this process, the path is fixed
     path = os.path.join(MEMORY_BASE_DIR, workspace_id, "threads")
     os.makedirs(path, exist_ok=True)
     return path
@@ -51,29 +67,240 @@ def get_thread_dir(workspace_id: str):
 def get_thread_path(workspace_id: str, thread_id: str):
     return os.path.join(get_thread_dir(workspace_id), f"{thread_id}.json")
 
-@router.get("/{workspace_id}", response_model=List[Thread])
-async def list_threads(workspace_id: str):
+
+# All thread/index IO goes through these two: fast_json (orjson when
+# available) parses and serializes in C and works on bytes directly, which
+# stdlib json.dump with indent=2 is particularly slow at with long histories.
+#
+# Snapshots are machine-read, so they default to compact form — indentation
+# roughly doubles the bytes written per save. Set THREADS_PRETTY_JSON=1 when
+# inspecting thread files by hand.
+_PRETTY_JSON = os.environ.get("THREADS_PRETTY_JSON", "") == "1"
+
+def _load(path: str):
+    # Parse straight out of the page cache: mmap hands the parser the
+    # kernel's buffer instead of copying the file into an intermediate
+    # bytes object first. Empty files can't be mapped, hence the fallback.
+    with open(path, 'rb') as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    return fast_json.loads(view)
+                finally:
+                    view.release()
+        except ValueError:
+            return fast_json.loads(f.read())
+
+def _dump(path: str, obj, indent: bool = None):
+    # Write-temp-then-rename, like the graph snapshot: open(path, 'w')
+    # truncates first, so a crash mid-write left a torn file that readers
+    # could only handle by silently dropping it. replace() is atomic, so
+    # readers see the old snapshot or the new one, never half of either.
+    if indent is None:
+        indent = _PRETTY_JSON
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(fast_json.dumps_bytes(obj, indent=indent))
+    os.replace(tmp_path, path)
+
+
+# --- Thread listing index ---
+# Listing used to open and fully parse every thread file (whole message
+# histories) just to read four header fields. index.json keeps one small
+# {thread_id: header} manifest per workspace, patched on create/delete and
+# title changes.
+
+import threading
+
+_index_lock = threading.Lock()
+
+def get_index_path(workspace_id: str):
+    return os.path.join(get_thread_dir(workspace_id), "index.json")
+
+def _load_header(path: str):
+    """The four listing fields from one thread file, or None if unreadable."""
+    try:
+        data = _load(path)
+        return {
+            "id": data["id"],
+            "workspace_id": data["workspace_id"],
+            "title": data.get("title", "Untitled"),
+            "created_at": data.get("created_at", "")
+        }
+    except ValueError as e:
+        # Torn JSON predating atomic snapshot writes (orjson and stdlib
+        # decode errors are both ValueErrors). Quarantine rather than skip,
+        # so the next rebuild doesn't re-parse the same bad file.
+        logger.warning("Quarantining corrupt thread file %s: %s", path, e)
+        try:
+            os.replace(path, path + ".corrupt")
+        except OSError:
+            pass
+        return None
+    except (KeyError, OSError) as e:
+        logger.warning("Skipping unreadable thread file %s: %s", path, e)
+        return None
+
+def _rebuild_index(workspace_id: str) -> dict:
+    """One-time scan of thread files for workspaces predating the index.
+    Loads fan out over a thread pool so a cold page cache costs roughly
+    max(per-file) rather than the sum of N serial read stalls."""
     thread_dir = get_thread_dir(workspace_id)
-    threads = []
-    if not os.path.exists(thread_dir):
-        return []
-    
-    for filename in os.listdir(thread_dir):
-        if filename.endswith(".json"):
-            try:
-                with open(os.path.join(thread_dir, filename), 'r') as f:
-                    data = json.load(f)
-                    threads.append(Thread(
-                        id=data["id"],
-                        workspace_id=data["workspace_id"],
-                        title=data.get("title", "Untitled"),
-                        created_at=data.get("created_at", "")
-                    ))
-            except:
-                continue
-    # Sort by created_at desc (if available, else name)
-    # threads.sort(key=lambda t: t.created_at, reverse=True) 
-    return threads
+    # scandir's DirEntry carries the file type and full path from the
+    # directory read itself — no stat or join per entry
+    with os.scandir(thread_dir) as it:
+        paths = [e.path for e in it
+                 if e.name.endswith(".json") and e.name != "index.json"
+                 and e.is_file(follow_symlinks=False)]
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as pool:
+        headers = pool.map(_load_header, paths)
+    return {h["id"]: h for h in headers if h}
+
+def _read_index(workspace_id: str) -> dict:
+    """Returns {thread_id: header}, rebuilding from thread files if the
+    index is missing or unreadable. Callers that mutate must hold
+    _index_lock around read-modify-write."""
+    path = get_index_path(workspace_id)
+    try:
+        return _load(path)
+    except (OSError, ValueError):
+        index = _rebuild_index(workspace_id)
+        try:
+            _dump(path, index, indent=False)
+        except OSError:
+            pass
+        return index
+
+def _update_index(workspace_id: str, entry: dict):
+    """Inserts or replaces one thread's header in the index."""
+    with _index_lock:
+        index = _read_index(workspace_id)
+        index[entry["id"]] = entry
+        _dump(get_index_path(workspace_id), index, indent=False)
+
+def _drop_from_index(workspace_id: str, thread_id: str):
+    with _index_lock:
+        index = _read_index(workspace_id)
+        if index.pop(thread_id, None) is not None:
+            _dump(get_index_path(workspace_id), index, indent=False)
+
+
+@functools.lru_cache(maxsize=256)
+def _load_thread(path: str, mtime_ns: int):
+    """Parsed thread JSON memoized per (path, mtime): repeated hits on the
+    same unchanged thread skip the read + parse, and any save bumps the
+    mtime so the next call reparses. Treat the result as read-only —
+    writers must copy before mutating."""
+    return _load(path)
+
+def load_thread(path: str):
+    return _load_thread(path, os.stat(path).st_mtime_ns)
+
+
+# --- Per-turn append log ---
+# Every chat turn used to rewrite the whole thread snapshot, so the bytes
+# written per turn grew with the history. New turns are appended as one
+# line each to <thread>.json.log and folded into the snapshot once the log
+# passes _LOG_COMPACT_BYTES (or on a title change, which keeps snapshot
+# headers authoritative for the listing index).
+
+_LOG_COMPACT_BYTES = 64 * 1024
+
+def _log_path(path: str):
+    return path + ".log"
+
+def _read_log(path: str) -> list:
+    """Messages appended since the last snapshot; a torn final line (crash
+    mid-append) is skipped."""
+    messages = []
+    try:
+        with open(_log_path(path), 'rb') as f:
+            for line in f:
+                try:
+                    messages.append(fast_json.loads(line))
+                except Exception:
+                    break
+    except OSError:
+        pass
+    return messages
+
+def _persist_turns(path: str, thread_data: dict, new_turns: list, force_snapshot: bool = False):
+    """Appends new_turns to the log, or — past the size threshold or when
+    forced — rewrites the snapshot (thread_data must already contain the
+    new turns) and drops the log. Returns the path that was written."""
+    try:
+        log_size = os.path.getsize(_log_path(path))
+    except OSError:
+        log_size = 0
+    if force_snapshot or log_size >= _LOG_COMPACT_BYTES:
+        _dump(path, thread_data)
+        try:
+            os.remove(_log_path(path))
+        except OSError:
+            pass
+        return path
+    with open(_log_path(path), 'ab') as f:
+        f.write(b"".join(fast_json.dumps_bytes(t) + b"\n" for t in new_turns))
+    return _log_path(path)
+
+# Turn saves relied entirely on default buffering — a crash could lose the
+# latest turns with no error. Fsyncing inside every save would mean one
+# disk flush per chat turn, so instead each save schedules a short per-file
+# debounce: a burst of saves (one user streaming, or many concurrent
+# clients on one thread) collapses into a single fsync. Same shape as the
+# memory store's debounced snapshot timer.
+
+_pending_fsyncs = {}
+
+def _fsync_path(path: str):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # compacted away or deleted in the meantime; nothing left to sync
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _schedule_fsync(path: str, delay: float = 0.05):
+    if path in _pending_fsyncs:
+        return
+
+    async def _run():
+        try:
+            await asyncio.sleep(delay)
+            await asyncio.to_thread(_fsync_path, path)
+        finally:
+            _pending_fsyncs.pop(path, None)
+
+    _pending_fsyncs[path] = asyncio.create_task(_run())
+
+
+def load_thread_full(path: str) -> dict:
+    """Snapshot merged with any logged turns. Returns a fresh dict with its
+    own messages list, safe for callers to mutate."""
+    cached = load_thread(path)
+    data = {**cached, "messages": list(cached.get("messages", []))}
+    data["messages"].extend(_read_log(path))
+    return data
+
+
+# Reads that can hit the disk (or rebuild the index) run via to_thread so
+# they don't stall the event loop under concurrent streaming chats. The
+# create/delete endpoints stay synchronous: a single small write is cheaper
+# than a threadpool hop.
+@router.get("/{workspace_id}")
+async def list_threads(workspace_id: str):
+    index = await asyncio.to_thread(_read_index, workspace_id)
+    # Index entries are Thread-shaped dicts we wrote ourselves; hand them
+    # straight to orjson instead of validating each into a Thread and
+    # re-serializing through response_model (same pattern as the skills
+    # listing)
+    return ORJSONResponse(list(index.values()))
 
 @router.post("/", response_model=Thread)
 async def create_thread(request: CreateThreadRequest):
@@ -87,9 +314,15 @@ async def create_thread(request: CreateThreadRequest):
     }
     
     path = get_thread_path(request.workspace_id, thread_id)
-    with open(path, 'w') as f:
-        json.dump(thread_data, f, indent=2)
-        
+    _dump(path, thread_data)
+
+    _update_index(request.workspace_id, {
+        "id": thread_id,
+        "workspace_id": request.workspace_id,
+        "title": request.title,
+        "created_at": thread_data["created_at"]
+    })
+
     return Thread(id=thread_id, workspace_id=request.workspace_id, title=request.title, created_at="")
 
 
@@ -112,9 +345,15 @@ async def create_thread_with_messages(request: CreateThreadWithMessagesRequest):
     }
     
     path = get_thread_path(request.workspace_id, thread_id)
-    with open(path, 'w') as f:
-        json.dump(thread_data, f, indent=2)
-        
+    _dump(path, thread_data)
+
+    _update_index(request.workspace_id, {
+        "id": thread_id,
+        "workspace_id": request.workspace_id,
+        "title": request.title,
+        "created_at": thread_data["created_at"]
+    })
+
     return Thread(id=thread_id, workspace_id=request.workspace_id, title=request.title, created_at=thread_data["created_at"])
 
 @router.delete("/{workspace_id}/{thread_id}")
@@ -122,42 +361,118 @@ async def delete_thread(workspace_id: str, thread_id: str):
     path = get_thread_path(workspace_id, thread_id)
     if os.path.exists(path):
         os.remove(path)
+        try:
+            os.remove(_log_path(path))
+        except OSError:
+            pass
+        _lc_cache.pop(path, None)
+        _drop_from_index(workspace_id, thread_id)
         return {"status": "deleted"}
     raise HTTPException(status_code=404, detail="Thread not found")
 
 @router.get("/{workspace_id}/{thread_id}/history")
-async def get_thread_history(workspace_id: str, thread_id: str):
+async def get_thread_history(workspace_id: str, thread_id: str, limit: Optional[int] = None):
+    """Thread messages, oldest first. limit=N returns only the last N —
+    polling UIs rarely need the full history, and the tail slice avoids
+    serializing megabytes of older turns per request."""
     path = get_thread_path(workspace_id, thread_id)
     if not os.path.exists(path):
         raise HTTPException(status_code=404, detail="Thread not found")
-        
-    with open(path, 'r') as f:
-        data = json.load(f)
-    
-    return data.get("messages", [])
+
+    thread_data = await asyncio.to_thread(load_thread_full, path)
+    messages = thread_data["messages"]
+    if limit is not None and limit >= 0:
+        return messages[-limit:] if limit else []
+    return messages
 
 from fastapi.responses import StreamingResponse
 
+# Reconstructed LangChain histories per thread file. Rebuilding Message
+# objects from dicts costs CPU proportional to history length on every
+# turn, even though between two turns of the same conversation nothing
+# else changed. Entries are keyed by the on-disk state (snapshot mtime +
+# log size) so any out-of-band write just misses, and the chat handler
+# writes the post-save history back through.
+_LC_CACHE_MAX = 512
+_lc_cache = {}  # path -> ((snapshot_mtime_ns, log_size), [BaseMessage])
+
+def _disk_state(path: str):
+    st = os.stat(path)
+    try:
+        log_size = os.path.getsize(_log_path(path))
+    except OSError:
+        log_size = 0
+    return (st.st_mtime_ns, log_size)
+
+async def _generate_title(workspace_id: str, path: str, user_message: str, result: dict):
+    """First-turn title generation, run as a BackgroundTask once the
+    streaming response has closed — the LLM roundtrip used to sit between
+    the final token and the connection closing. Rewrites the snapshot
+    (not the log) so the title lands in the header the index reads."""
+    full_response = result.get("response", "")
+    # Import here to avoid top-level circular issues or just standard practice
+    from app.llm_config import llm_config
+
+    new_title = None
+    try:
+        llm = llm_config.get_chat_llm()
+
+        title_prompt = f"""Generate a short, concise title (max 5 words) for this conversation based on the first interaction.
+
+        User: {user_message}
+        AI: {full_response[:200]}...
+
+        Title:"""
+
+        title_resp = await llm.ainvoke([HumanMessage(content=title_prompt)])
+        new_title = strip_markdown_from_title(title_resp.content.strip().strip('"'))
+    except Exception as e:
+        print(f"Title Generation Failed: {e}")
+
+    thread_data = await asyncio.to_thread(load_thread_full, path)
+    if new_title is None:
+        # Fallback
+        if thread_data["title"] != "New Chat":
+            return
+        new_title = user_message[:30] + "..."
+    thread_data["title"] = new_title
+
+    written = await asyncio.to_thread(_persist_turns, path, thread_data, [], True)
+    _schedule_fsync(written)
+    await asyncio.to_thread(_update_index, workspace_id, {
+        "id": thread_data["id"],
+        "workspace_id": thread_data["workspace_id"],
+        "title": thread_data["title"],
+        "created_at": thread_data.get("created_at", "")
+    })
+
+
 @router.post("/{workspace_id}/{thread_id}/chat")
-async def chat_in_thread(workspace_id: str, thread_id: str, request: ChatRequest):
+async def chat_in_thread(workspace_id: str, thread_id: str, request: ChatRequest, background_tasks: BackgroundTasks):
     path = get_thread_path(workspace_id, thread_id)
     if not os.path.exists(path):
         raise HTTPException(status_code=404, detail="Thread not found")
-        
-    # 1. Load History
-    with open(path, 'r') as f:
-        thread_data = json.load(f)
-        
-    stored_messages = thread_data.get("messages", [])
-    
-    # Convert stored dicts to LangChain messages
-    langchain_messages = []
-    for m in stored_messages:
-        if m["role"] == "user":
-            langchain_messages.append(HumanMessage(content=m["content"]))
-        elif m["role"] == "assistant":
-            langchain_messages.append(AIMessage(content=m["content"]))
-            
+
+    # 1. Load History (snapshot + log tail; the returned dict is ours to
+    # mutate)
+    thread_data = await asyncio.to_thread(load_thread_full, path)
+    state = await asyncio.to_thread(_disk_state, path)
+    is_first_turn = not thread_data["messages"]
+    # Filled in by the generator; read by the title task after the stream
+    result = {"response": ""}
+
+    # Convert stored dicts to LangChain messages (single dict lookup per
+    # message instead of role branching; unknown roles drop out), unless
+    # the previous turn's write-through already holds this history
+    cached_lc = _lc_cache.get(path)
+    if cached_lc and cached_lc[0] == state:
+        langchain_messages = list(cached_lc[1])
+    else:
+        langchain_messages = [
+            _ROLE_CLS[m["role"]](content=m["content"])
+            for m in thread_data["messages"] if m["role"] in _ROLE_CLS
+        ]
+
     # 2. Add New Message
     new_human_msg = HumanMessage(content=request.message)
     langchain_messages.append(new_human_msg)
@@ -169,10 +484,34 @@ async def chat_in_thread(workspace_id: str, thread_id: str, request: ChatRequest
     }
     
     async def event_generator():
-        full_response = ""
+        # Accumulate the response as a chunk list and join once at the end:
+        # repeated += on a growing string re-copies the whole prefix per
+        # token, which goes quadratic on long answers
+        chunks = []
+        # Every yield is its own ASGI send and socket write, so per-token
+        # chunks dominated the cost of long responses. Tokens buffer until
+        # ~64 bytes or 30ms since the last flush — same bytes, far fewer
+        # sends — and flush at tool/usage boundaries to keep ordering.
+        buf = []
+        buf_len = 0
+        last_flush = time.monotonic()
         try:
-            # astream_events yields events from all nodes/tools/llms
-            async for event in app_agent.astream_events(initial_state, version="v1", config={"recursion_limit": 100}):
+            # astream_events yields events from all nodes/tools/llms.
+            # A fresh checkpoint thread_id per call: this endpoint passes the
+            # full message history itself, so persisted state would duplicate it.
+            stream_config = {
+                "recursion_limit": 100,
+                "configurable": {"thread_id": str(uuid.uuid4())}
+            }
+            # include_types drops chain/graph-node events inside LangChain
+            # instead of constructing and dispatching them for us to ignore;
+            # only model and tool events survive. The langgraph_node check
+            # below still distinguishes "generate" from the extract node's
+            # internal LLM calls, which are chat_model events too.
+            async for event in app_agent.astream_events(
+                initial_state, version="v1", config=stream_config,
+                include_types=["chat_model", "tool"],
+            ):
                 kind = event["event"]
                 name = event.get("name", "")
                 
@@ -182,8 +521,15 @@ async def chat_in_thread(workspace_id: str, thread_id: str, request: ChatRequest
                     if event.get("metadata", {}).get("langgraph_node") == "generate":
                         content = event["data"]["chunk"].content
                         if content:
-                            full_response += content
-                            yield content
+                            chunks.append(content)
+                            buf.append(content)
+                            buf_len += len(content)
+                            now = time.monotonic()
+                            if buf_len >= 64 or now - last_flush > 0.03:
+                                yield ''.join(buf)
+                                buf.clear()
+                                buf_len = 0
+                                last_flush = now
 
                 # 1.5 Capture Token Usage
                 elif kind == "on_chat_model_end":
@@ -223,58 +569,70 @@ async def chat_in_thread(workspace_id: str, thread_id: str, request: ChatRequest
                              usage_str = f"\n\n*(Tokens: {input_tokens} input, {output_tokens} output)*"
                              
                              # Append to full response for storage
-                             full_response += usage_str
-                             # Stream via yield
+                             chunks.append(usage_str)
+                             # Stream via yield (flushing buffered tokens first)
+                             if buf:
+                                 yield ''.join(buf)
+                                 buf.clear()
+                                 buf_len = 0
                              yield usage_str
 
                 # 2. Output Tool Usage (Progress Indicators)
                 elif kind == "on_tool_start" and name not in ["tools", "__start__"]:
                     # We want to show real tools, not the "tools" node itself
                     # Format as a distinct block
+                    if buf:
+                        yield ''.join(buf)
+                        buf.clear()
+                        buf_len = 0
                     yield f"\n> 🛠️ **Usage**: `{name}`\n\n"
                     
                 # 3. Output Tool Result (Optional, maybe for debugging or verbose mode?)
                 # For now, let's just show start.
-                        
+
+            if buf:
+                yield ''.join(buf)
+                buf.clear()
+
         except Exception as e:
             print(f"Streaming Error: {e}")
             import traceback
             traceback.print_exc()
+            if buf:
+                yield ''.join(buf)
+                buf.clear()
             yield f"\n[Error: {str(e)}]"
             
         # 4. Save History (After stream completes)
         # Re-read to minimize race conditions? Ideally yes, but single user for now.
         # We append the user message and the full AI response.
-        thread_data["messages"].append({"role": "user", "content": request.message})
-        thread_data["messages"].append({"role": "assistant", "content": full_response})
-        
-        # Update title if needed
-        # Logic: If this is the FIRST interaction (2 messages: user + assistant), generate a title.
-        # We use a simple LLM call for this.
-        if len(thread_data["messages"]) == 2:
-             try:
-                # Import here to avoid top-level circular issues or just standard practice
-                from app.llm_config import llm_config
-                
-                llm = llm_config.get_chat_llm()
-                
-                title_prompt = f"""Generate a short, concise title (max 5 words) for this conversation based on the first interaction.
-                
-                User: {request.message}
-                AI: {full_response[:200]}...
-                
-                Title:"""
-                
-                title_resp = llm.invoke([HumanMessage(content=title_prompt)])
-                new_title = strip_markdown_from_title(title_resp.content.strip().strip('"'))
-                thread_data["title"] = new_title
-             except Exception as e:
-                 print(f"Title Generation Failed: {e}")
-                 # Fallback
-                 if thread_data["title"] == "New Chat":
-                    thread_data["title"] = request.message[:30] + "..."
-             
-        with open(path, 'w') as f:
-            json.dump(thread_data, f, indent=2)
+        full_response = ''.join(chunks)
+        new_turns = [
+            {"role": "user", "content": request.message},
+            {"role": "assistant", "content": full_response},
+        ]
+        thread_data["messages"].extend(new_turns)
+        result["response"] = full_response
+
+        # The per-call checkpoint thread is throwaway (history travels in the
+        # request); drop its rows or checkpoints.db grows per turn forever
+        await drop_ephemeral_checkpoint(stream_config["configurable"]["thread_id"])
+
+        # O(1) append for the common turn; the first-turn title rewrite
+        # happens in _generate_title after the response closes
+        written = await asyncio.to_thread(_persist_turns, path, thread_data, new_turns)
+        _schedule_fsync(written)
+
+        # Write-through: next turn on this thread skips the rebuild.
+        # langchain_messages already ends with this turn's HumanMessage.
+        if len(_lc_cache) >= _LC_CACHE_MAX:
+            _lc_cache.pop(next(iter(_lc_cache)))
+        _lc_cache[path] = (
+            await asyncio.to_thread(_disk_state, path),
+            langchain_messages + [AIMessage(content=full_response)],
+        )
+
+    if is_first_turn:
+        background_tasks.add_task(_generate_title, workspace_id, path, request.message, result)
 
     return StreamingResponse(event_generator(), media_type="text/plain")
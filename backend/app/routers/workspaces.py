@@ -1,11 +1,12 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks, Form
+from fastapi import APIRouter, HTTPException, Path, UploadFile, File, BackgroundTasks, Form
 from pydantic import BaseModel
 from typing import List, Optional
 import os
 import shutil
 import json
 import uuid
-from app.memory_store import GraphMemory
+from app.memory_store import get_memory, evict_memory, WORKSPACE_ID_RE, WORKSPACE_ID_PATTERN
+from app.routers import threads
 from app.llm_config import llm_config
 from datetime import datetime
 # Postponing import of document_processor to avoid circular deps if any, but should be fine.
@@ -32,7 +33,7 @@ async def list_workspaces():
         item_path = os.path.join(MEMORY_BASE_DIR, item)
         if os.path.isdir(item_path):
             try:
-                mem = GraphMemory(workspace_id=item, base_dir=MEMORY_BASE_DIR)
+                mem = get_memory(item)
                 stats = mem.get_stats()
                 workspaces.append(Workspace(
                     id=item,
@@ -45,15 +46,16 @@ async def list_workspaces():
 
 @router.post("/", response_model=Workspace)
 async def create_workspace(request: CreateWorkspaceRequest):
-    import re
-    if not re.match(r'^[a-zA-Z0-9_\-\s]+$', request.workspace_id):
-         raise HTTPException(status_code=400, detail="Workspace ID must be alphanumeric (spaces, dashes, and underscores allowed)")
+    # Same pattern get_memory enforces (including the 64-char cap), so an
+    # over-long id is a clean 400 here instead of a ValueError-turned-500
+    if not WORKSPACE_ID_RE.match(request.workspace_id):
+         raise HTTPException(status_code=400, detail="Workspace ID must be alphanumeric (spaces, dashes, and underscores allowed; max 64 chars)")
     
     path = os.path.join(MEMORY_BASE_DIR, request.workspace_id)
     if os.path.exists(path):
          raise HTTPException(status_code=400, detail="Workspace already exists")
     
-    mem = GraphMemory(workspace_id=request.workspace_id, base_dir=MEMORY_BASE_DIR)
+    mem = get_memory(request.workspace_id)
     stats = mem.get_stats()
     return Workspace(id=request.workspace_id, node_count=stats["node_count"], edge_count=stats["edge_count"])
 
@@ -62,6 +64,11 @@ async def delete_workspace(workspace_id: str):
     path = os.path.join(MEMORY_BASE_DIR, workspace_id)
     if os.path.exists(path):
         shutil.rmtree(path)
+        evict_memory(workspace_id)
+        # The threads router caches directory creation per workspace; the
+        # cached path no longer exists, so drop it or a recreated workspace
+        # 500s on every thread write until restart
+        threads.get_thread_dir.cache_clear()
         return {"status": "deleted"}
     raise HTTPException(status_code=404, detail="Workspace not found")
 
@@ -70,9 +77,8 @@ class RenameWorkspaceRequest(BaseModel):
 
 @router.post("/{workspace_id}/rename")
 async def rename_workspace(workspace_id: str, request: RenameWorkspaceRequest):
-    import re
-    if not re.match(r'^[a-zA-Z0-9_\-\s]+$', request.new_workspace_id):
-         raise HTTPException(status_code=400, detail="New Workspace ID must be alphanumeric (spaces, dashes, and underscores allowed)")
+    if not WORKSPACE_ID_RE.match(request.new_workspace_id):
+         raise HTTPException(status_code=400, detail="New Workspace ID must be alphanumeric (spaces, dashes, and underscores allowed; max 64 chars)")
 
     base_path = os.path.join(MEMORY_BASE_DIR, workspace_id)
     new_path = os.path.join(MEMORY_BASE_DIR, request.new_workspace_id)
@@ -85,13 +91,16 @@ async def rename_workspace(workspace_id: str, request: RenameWorkspaceRequest):
         
     try:
         shutil.move(base_path, new_path)
+        evict_memory(workspace_id)
+        # See delete_workspace: the old id's cached thread dir is gone
+        threads.get_thread_dir.cache_clear()
         return {"status": "success", "old_id": workspace_id, "new_id": request.new_workspace_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Rename failed: {str(e)}")
 
 @router.get("/{workspace_id}/stats")
-async def get_workspace_stats(workspace_id: str):
-    mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+async def get_workspace_stats(workspace_id: str = Path(pattern=WORKSPACE_ID_PATTERN)):
+    mem = get_memory(workspace_id)
     return mem.get_stats()
 
 class WorkspaceSettings(BaseModel):
@@ -314,7 +323,7 @@ async def ingest_url(workspace_id: str, request: IngestUrlRequest, background_ta
     path = os.path.join(MEMORY_BASE_DIR, workspace_id)
     if not os.path.exists(path):
         # Create workspace if it doesn't exist
-        GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+        get_memory(workspace_id)
     
     try:
         headers = {
@@ -494,7 +503,7 @@ async def create_note(workspace_id: str, request: CreateNoteRequest):
 
     # Sync Embedding
     try:
-        mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+        mem = get_memory(workspace_id)
         mem.index_note(note_id, note.title, note.content)
     except Exception as e:
         print(f"Embedding sync failed: {e}")
@@ -536,7 +545,7 @@ async def update_note(workspace_id: str, note_id: str, request: UpdateNoteReques
 
     # Sync Embedding
     try:
-        mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+        mem = get_memory(workspace_id)
         mem.index_note(note_id, data["title"], data["content"])
     except Exception as e:
         print(f"Embedding sync failed: {e}")
@@ -553,7 +562,7 @@ async def delete_note(workspace_id: str, note_id: str):
         
         # Sync Embedding
         try:
-            mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+            mem = get_memory(workspace_id)
             mem.delete_note_embedding(note_id)
         except Exception as e:
             print(f"Embedding sync failed: {e}")
@@ -708,7 +717,7 @@ async def generate_persona(workspace_id: str, request: GeneratePersonaRequest):
                 
             # 3. Seed Memories
             memories = data.get("memories", {})
-            mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+            mem = get_memory(workspace_id)
             
             # Clear existing memory? Maybe not. Just append.
             # Actually, for a fresh persona, we might want to clear, but "Generate" implies adding or setting.
@@ -767,7 +776,7 @@ async def get_knowledge_gaps(
     if not os.path.exists(path):
         raise HTTPException(status_code=404, detail="Workspace not found")
     
-    mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+    mem = get_memory(workspace_id)
     return mem.get_knowledge_gaps(limit=limit, max_degree=max_degree)
 
 
@@ -853,7 +862,9 @@ async def import_graph(workspace_id: str, background_tasks: BackgroundTasks, fil
     # We define a helper task wrapper
     def run_reindex(wid):
         try:
-            mem = GraphMemory(workspace_id=wid, base_dir=MEMORY_BASE_DIR)
+            # Drop any cached instance: graph.json was just replaced on disk
+            evict_memory(wid)
+            mem = get_memory(wid)
             mem.reindex_graph()
         except Exception as e:
             print(f"Background reindex failed: {e}")
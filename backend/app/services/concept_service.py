@@ -1,13 +1,13 @@
 import json
 import os
-from app.memory_store import GraphMemory
+from app.memory_store import get_memory
 from app.llm_config import llm_config
 from langchain_core.messages import SystemMessage, HumanMessage
 
 class ConceptService:
     def __init__(self, workspace_id: str):
         self.workspace_id = workspace_id
-        self.memory = GraphMemory(workspace_id=workspace_id)
+        self.memory = get_memory(workspace_id)
         self.concepts_path = os.path.join(self.memory.workspace_dir, "concepts.json")
 
     def get_concepts(self):
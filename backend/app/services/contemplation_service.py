@@ -1,4 +1,4 @@
-from app.memory_store import GraphMemory, MEMORY_BASE_DIR
+from app.memory_store import get_memory, MEMORY_BASE_DIR
 from app.llm_config import llm_config
 from langchain_core.messages import HumanMessage
 from langchain_community.tools import DuckDuckGoSearchRun
@@ -38,7 +38,7 @@ async def contemplate_logic(workspace_id: str, n: int = 3, topic: str = None, sa
         return False
 
     log(f"Starting contemplation. n={n}, topic={topic}, save_to_notes={save_to_notes}, depth={depth}")
-    mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+    mem = get_memory(workspace_id)
     
     # 1. Pick nodes (Random or Related)
     if topic:
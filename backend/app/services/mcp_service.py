@@ -94,7 +94,7 @@ class MCPService:
             # Read initialization response with timeout
             try:
                 response_line = await asyncio.wait_for(
-                    asyncio.get_event_loop().run_in_executor(None, process.stdout.readline),
+                    asyncio.to_thread(process.stdout.readline),
                     timeout=10.0
                 )
                 init_response = json.loads(response_line) if response_line else {}
@@ -130,7 +130,7 @@ class MCPService:
             for attempt in range(max_attempts):
                 try:
                     response_line = await asyncio.wait_for(
-                        asyncio.get_event_loop().run_in_executor(None, process.stdout.readline),
+                        asyncio.to_thread(process.stdout.readline),
                         timeout=10.0
                     )
                     print(f"MCP DEBUG [{name}]: Response {attempt}: {response_line[:500] if response_line else 'None'}")
@@ -203,17 +203,20 @@ class MCPService:
             if server.process:
                 server.process.terminate()
                 try:
-                    server.process.wait(timeout=5)
+                    # Blocking wait runs in a worker thread so concurrent
+                    # disconnects actually overlap
+                    await asyncio.to_thread(server.process.wait, timeout=5)
                 except subprocess.TimeoutExpired:
                     server.process.kill()
             del self._servers[name]
             return True
         return False
-    
+
     async def disconnect_all(self):
-        """Disconnect all MCP servers."""
-        for name in list(self._servers.keys()):
-            await self.disconnect_server(name)
+        """Disconnect all MCP servers concurrently."""
+        names = list(self._servers.keys())
+        if names:
+            await asyncio.gather(*(self.disconnect_server(name) for name in names))
     
     async def call_tool(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Any:
         """
@@ -249,7 +252,7 @@ class MCPService:
             server.process.stdin.flush()
             
             response_line = await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(None, server.process.stdout.readline),
+                asyncio.to_thread(server.process.stdout.readline),
                 timeout=30.0
             )
             response = json.loads(response_line) if response_line else {}
@@ -297,14 +300,23 @@ class MCPService:
     async def refresh_connections(self):
         """Refresh connections to all configured MCP servers."""
         await self.disconnect_all()
-        
+
         configs = self._get_config()
+        if not configs:
+            return {}
+
+        # Connect in parallel: total restart latency becomes the slowest
+        # server's handshake instead of the sum over all of them
+        outcomes = await asyncio.gather(
+            *(self.connect_server(config) for config in configs),
+            return_exceptions=True
+        )
         results = {}
-        
-        for config in configs:
-            result = await self.connect_server(config)
-            results[config.name] = result
-        
+        for config, outcome in zip(configs, outcomes):
+            if isinstance(outcome, Exception):
+                results[config.name] = {"connected": False, "error": str(outcome)}
+            else:
+                results[config.name] = outcome
         return results
     
     def get_langchain_tools(self) -> List[StructuredTool]:
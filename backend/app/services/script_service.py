@@ -4,7 +4,7 @@ import uuid
 import re
 from datetime import datetime
 from langchain_core.messages import HumanMessage
-from app.memory_store import GraphMemory, MEMORY_BASE_DIR
+from app.memory_store import get_memory, MEMORY_BASE_DIR
 from app.llm_config import llm_config
 from app.routers.workspaces import get_llm_helper
 
@@ -16,7 +16,7 @@ def get_scripts_dir(workspace_id: str):
 async def generate_script_logic(workspace_id: str, topic: str):
     try:
         # 1. Retrieve Context
-        mem = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+        mem = get_memory(workspace_id)
         context = mem.retrieve_context(topic, k=5)
         
         # 2. LLM Generation
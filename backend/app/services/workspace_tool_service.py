@@ -6,7 +6,7 @@ consulted by other workspaces.
 """
 import os
 import json
-from app.memory_store import GraphMemory
+from app.memory_store import get_memory
 from app.llm_config import llm_config
 from langchain_core.messages import HumanMessage
 from app.services.concept_service import ConceptService
@@ -72,7 +72,7 @@ def consult_workspace(workspace_id: str, query: str, k: int = 5, depth: int = 2)
         return f"Error: Workspace '{workspace_id}' not found."
     
     try:
-        memory = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+        memory = get_memory(workspace_id)
         context = memory.retrieve_context(query, k=k, depth=depth, include_descriptions=True)
         
         if not context or context.strip() == "":
@@ -99,7 +99,7 @@ async def generate_tool_description(workspace_id: str):
     concepts = concept_service.get_concepts()
     
     # Get some node stats for context
-    memory = GraphMemory(workspace_id=workspace_id, base_dir=MEMORY_BASE_DIR)
+    memory = get_memory(workspace_id)
     stats = memory.get_stats()
     
     # Build context for LLM
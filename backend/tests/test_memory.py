@@ -1,3 +1,4 @@
+import json
 import unittest
 from unittest.mock import MagicMock, patch
 import sys
@@ -33,10 +34,75 @@ class TestGraphMemory(unittest.TestCase):
         self.memory.add_entity("Alice", "Person", "A developer")
         self.memory.add_entity("Bob", "Person", "A manager")
         self.memory.add_relation("Alice", "Bob", "reports_to")
-        
+
         self.assertTrue(self.memory.graph.has_edge("Alice", "Bob"))
         self.assertEqual(self.memory.graph.edges["Alice", "Bob"]["relation"], "reports_to")
 
+    def test_add_entities_bulk_dedup_and_merge(self):
+        """Repeated names within a batch dedupe; new text appends, seen text doesn't."""
+        self.memory.add_entities_bulk([
+            {"name": "Ada", "type": "Person", "description": "Mathematician"},
+            {"name": "Ada", "type": "Person", "description": "Wrote the first program"},
+        ])
+        self.assertEqual(self.memory.graph.nodes["Ada"]["description"],
+                         "Mathematician; Wrote the first program")
+
+        # Re-adding an already-present description must not append again
+        self.memory.add_entities_bulk([{"name": "Ada", "type": "Person", "description": "Mathematician"}])
+        self.assertEqual(self.memory.graph.nodes["Ada"]["description"],
+                         "Mathematician; Wrote the first program")
+
+    def test_journal_replay(self):
+        """Journaled mutations that never reached a snapshot are re-applied on
+        load; a torn trailing line (crash mid-append) is skipped."""
+        with open(self.memory.journal_path, 'w') as f:
+            f.write(json.dumps({"op": "add_node", "id": "Crashed", "type": "Person",
+                                "description": "Recovered"}) + "\n")
+            f.write(json.dumps({"op": "add_edge", "source": "Crashed", "target": "Other",
+                                "relation": "knows"}) + "\n")
+            f.write('{"op": "add_node", "id": "Torn"')
+
+        recovered = GraphMemory(workspace_id="test", base_dir="./tests/test_memory_data")
+        self.assertTrue(recovered.graph.has_node("Crashed"))
+        self.assertEqual(recovered.graph.nodes["Crashed"]["description"], "Recovered")
+        self.assertTrue(recovered.graph.has_edge("Crashed", "Other"))
+        self.assertFalse(recovered.graph.has_node("Torn"))
+        # Recovery must be flushable, or the journal replays on every boot
+        self.assertTrue(recovered._dirty)
+
+    def test_get_graph_delta_compaction(self):
+        base = self.memory.version
+        epoch = self.memory.epoch
+        self.memory.add_entity("Keep", "Person", "Stays")
+        self.memory.add_entity("Temp", "Person", "Short-lived")
+        self.memory.delete_entity("Temp")
+
+        delta = self.memory.get_graph_delta(base, epoch=epoch)
+        added = [n["id"] for n in delta["added_nodes"]]
+        self.assertIn("Keep", added)
+        # Add followed by remove compacts away from the added list
+        self.assertNotIn("Temp", added)
+        self.assertIn("Temp", delta["removed_nodes"])
+        self.assertEqual(delta["version"], self.memory.version)
+        self.assertEqual(delta["epoch"], epoch)
+
+    def test_get_graph_delta_version_bounds(self):
+        epoch = self.memory.epoch
+        self.memory.add_entity("Node", "Person", "Something")
+
+        # Caught up: empty delta at the current version
+        delta = self.memory.get_graph_delta(self.memory.version, epoch=epoch)
+        self.assertEqual(delta["added_nodes"], [])
+        self.assertEqual(delta["removed_nodes"], [])
+
+        # Ahead of us (stale client from a previous process): full resync
+        self.assertIsNone(self.memory.get_graph_delta(self.memory.version + 1, epoch=epoch))
+
+        # A version from another process lifetime is meaningless even when it
+        # is in range — the epoch mismatch must force a full resync
+        self.assertIsNone(self.memory.get_graph_delta(0, epoch="stale-epoch"))
+        self.assertIsNone(self.memory.get_graph_delta(0))
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -1120,49 +1120,56 @@ export const useStore = create((set, get) => ({
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
 
-            while (true) {
-                const { done, value } = await reader.read();
-                if (done) break;
-                const chunk = decoder.decode(value, { stream: true });
-                aiContent += chunk;
-
-                // Update UI incrementally (but don't show metadata marker)
-                const displayContent = aiContent.split('###GRAPH_CONTEXT###')[0];
+            // Parse SSE frames (event: .../data: ...) — no more sentinel
+            // scanning; tokens and graph metadata arrive as distinct events
+            let buffer = '';
+            const updateAssistant = (content) => {
                 set(state => {
                     const msgs = [...state.graphChatMessages];
                     const lastMsg = msgs[msgs.length - 1];
                     if (lastMsg.role === 'assistant') {
-                        lastMsg.content = displayContent;
+                        lastMsg.content = content;
                     }
                     return { graphChatMessages: msgs };
                 });
-            }
-
-            // Parse metadata from the end of the response
-            if (aiContent.includes('###GRAPH_CONTEXT###')) {
-                const parts = aiContent.split('###GRAPH_CONTEXT###');
-                const textContent = parts[0].trim();
-                const metadataStr = parts[1];
-
-                try {
-                    const metadata = JSON.parse(metadataStr);
-                    set({
-                        highlightedNodes: metadata.retrieved_nodes || [],
-                        highlightedEdges: metadata.retrieved_edges || []
-                    });
-                } catch (e) {
-                    console.error("Failed to parse graph context metadata", e);
-                }
+            };
 
-                // Update final message content without metadata
-                set(state => {
-                    const msgs = [...state.graphChatMessages];
-                    const lastMsg = msgs[msgs.length - 1];
-                    if (lastMsg.role === 'assistant') {
-                        lastMsg.content = textContent;
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                let sep;
+                while ((sep = buffer.indexOf('\n\n')) !== -1) {
+                    const frame = buffer.slice(0, sep);
+                    buffer = buffer.slice(sep + 2);
+
+                    let event = 'message';
+                    let data = '';
+                    for (const line of frame.split('\n')) {
+                        if (line.startsWith('event: ')) event = line.slice(7);
+                        else if (line.startsWith('data: ')) data += line.slice(6);
                     }
-                    return { graphChatMessages: msgs };
-                });
+                    if (!data) continue;
+
+                    try {
+                        const payload = JSON.parse(data);
+                        if (event === 'token') {
+                            aiContent += payload;
+                            updateAssistant(aiContent);
+                        } else if (event === 'graph_context') {
+                            set({
+                                highlightedNodes: payload.retrieved_nodes || [],
+                                highlightedEdges: payload.retrieved_edges || []
+                            });
+                        } else if (event === 'error') {
+                            aiContent += `\n[Error: ${payload}]`;
+                            updateAssistant(aiContent);
+                        }
+                    } catch (e) {
+                        console.error("Failed to parse graph chat event", e);
+                    }
+                }
             }
 
         } catch (e) {